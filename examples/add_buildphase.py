@@ -37,20 +37,6 @@ def rel(filename):
     return join(here(), filename)
 
 
-def getobj(root, gid):
-    return root['objects'][gid]
-
-
-def find_isas(root, isa):
-    for key, obj in root['objects'].items():
-        if obj['isa'] == isa:
-            yield key, obj
-
-
-def find_first(root, isa):
-    return find_isas(root, isa).next()[1]
-
-
 def main():
     filename = rel(INTL_PROJECT_FILENAME)
     with open(filename, 'rb') as f:
@@ -63,8 +49,9 @@ def main():
 
     gen = xcodeprojer.UniqueXcodeIDGenerator()
 
-    pbxproject = find_first(root, 'PBXProject')
-    firsttarget = getobj(root, pbxproject['targets'][0])
+    project = xcodeprojer.Project(root)
+    pbxproject = project.objects[project.by_isa('PBXProject')[0]]
+    firsttarget = project.objects[pbxproject['targets'][0]]
 
     # Construct a new buildphase as any other JSON object
     newbuildphase = {'isa': 'PBXShellScriptBuildPhase',
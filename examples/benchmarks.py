@@ -0,0 +1,610 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+#
+# Copyright (c) 2014 Michael Krause ( http://krause-software.com/ ).
+
+# You are free to use this code under the MIT license:
+# http://opensource.org/licenses/MIT
+
+"""Time xcodeprojer on large synthetic projects.
+
+Real projects with hundreds of thousands of objects are rare and
+usually not public, so we blow up the MiniProject from the tests
+by adding many source files to it.
+
+    $ examples/benchmarks.py --files 50000 --sort
+"""
+
+from __future__ import print_function
+
+import sys
+import argparse
+import random
+import json
+import time
+import codecs
+import difflib
+import tempfile
+import shutil
+import os
+import multiprocessing
+from collections import OrderedDict
+from os.path import abspath, dirname, join
+
+# Set up the Python path so we find the xcodeprojer module in the parent directory
+# relative to this file.
+sys.path.insert(1, dirname(dirname(abspath(__file__))))
+
+import utils
+import xcodeprojer
+
+PY2 = sys.version_info[0] == 2
+PY3 = sys.version_info[0] == 3
+
+
+MINI_PROJECT_FILENAME = '../tests/data/MiniProject/MiniProject.xcodeproj/project.pbxproj'
+PROJECTNAME = 'MiniProject'
+DEFAULT_FILES = 20000
+
+
+def here():
+    return dirname(abspath(__file__))
+
+
+def rel(filename):
+    return join(here(), filename)
+
+
+def find_first(root, isa):
+    for key, obj in root['objects'].items():
+        if obj['isa'] == isa:
+            return key, obj
+
+
+def synthetic_project(numfiles):
+    """Return the MiniProject with numfiles additional source files
+    in the canonical Xcode plist format.
+    """
+    with open(rel(MINI_PROJECT_FILENAME), 'rb') as f:
+        root, parseinfo = xcodeprojer.parse(f.read())
+
+    gids = xcodeprojer.generate_gids(2 * numfiles, username='bench', pid=1, refdate='2014-09-01T12:00:00Z')
+    objects = root['objects']
+    _, group = find_first(root, 'PBXGroup')
+    _, sources = find_first(root, 'PBXSourcesBuildPhase')
+    for i in range(numfiles):
+        fileref, buildfile = next(gids), next(gids)
+        objects[fileref] = {'isa': 'PBXFileReference',
+                            'lastKnownFileType': 'sourcecode.c.c',
+                            'path': 'file%d.c' % i,
+                            'sourceTree': '<group>'}
+        objects[buildfile] = {'isa': 'PBXBuildFile', 'fileRef': fileref}
+        group['children'].append(fileref)
+        sources['files'].append(buildfile)
+    return xcodeprojer.unparse(root, projectname=PROJECTNAME)
+
+
+def best_of(func, repeat=3):
+    times = []
+    for _ in range(repeat):
+        t0 = time.time()
+        func()
+        times.append(time.time() - t0)
+    return min(times)
+
+
+def report(label, seconds, numbytes=None):
+    line = '%-44s %8.3f s' % (label, seconds)
+    if numbytes is not None:
+        line += '  %10d bytes' % numbytes
+    print(line)
+
+
+def sort_all_dicts(root):
+    """Run the unparser's sorting over every dict of the tree
+    the same way it happens during an unparse.
+    """
+    unparser = xcodeprojer.Unparser(root)
+    unparser.version = int(root['objectVersion'])
+    unparser.keypath = ['objects']
+    unparser.sorted_items(root['objects'])
+    unparser.keypath = ['objects', None]
+    for obj in root['objects'].values():
+        unparser.sorted_items(obj)
+
+
+def bench_sort(text, repeat):
+    """Sort the project once in canonical order and once with
+    the objects shuffled so the sorting fast path can't be taken.
+    """
+    root, parseinfo = xcodeprojer.parse(text, dictionarytype=OrderedDict)
+    items = list(root['objects'].items())
+    random.Random(0).shuffle(items)
+    shuffled = OrderedDict(root)
+    shuffled['objects'] = OrderedDict((k, OrderedDict(sorted(v.items(), reverse=True)))
+                                      for k, v in items)
+
+    for label, tree in [('canonical order', root),
+                        ('shuffled objects and keys', shuffled)]:
+        seconds = best_of(lambda: sort_all_dicts(tree), repeat)
+        report('sort ' + label, seconds)
+        seconds = best_of(lambda: xcodeprojer.unparse(tree, projectname=PROJECTNAME), repeat)
+        report('unparse ' + label, seconds)
+
+
+def bench_parallel(text, repeat):
+    root, parseinfo = xcodeprojer.parse(text)
+    expected = xcodeprojer.unparse(root, projectname=PROJECTNAME)
+    # Worker processes can only pay off with more than one cpu.
+    print('%d cpus available' % multiprocessing.cpu_count())
+    for workers in [None, 2, 4, 8]:
+        output = xcodeprojer.unparse(root, projectname=PROJECTNAME, workers=workers)
+        assert output == expected
+        seconds = best_of(lambda: xcodeprojer.unparse(root, projectname=PROJECTNAME, workers=workers), repeat)
+        report('unparse with %s workers' % (workers or 'no'), seconds)
+
+
+def bench_xml(text, repeat):
+    root, parseinfo = xcodeprojer.parse(text)
+    output = xcodeprojer.unparse(root, format='xml')
+    seconds = best_of(lambda: xcodeprojer.unparse(root, format='xml'), repeat)
+    report('unparse xml', seconds, len(output))
+
+    def write_file():
+        with tempfile.TemporaryFile() as f:
+            return xcodeprojer.unparse_to(f, root, format='xml')
+
+    seconds = best_of(write_file, repeat)
+    report('unparse_to xml file', seconds, write_file())
+
+
+def bench_json(text, repeat):
+    """Compare the indented and the compact JSON output,
+    in memory and written to a file, and how fast they parse again.
+    """
+    root, parseinfo = xcodeprojer.parse(text)
+
+    def write_file(format):
+        with tempfile.TemporaryFile() as f:
+            return xcodeprojer.unparse_to(f, root, format=format)
+
+    for format in ['json', 'json-compact']:
+        output = xcodeprojer.unparse(root, format=format)
+        seconds = best_of(lambda: xcodeprojer.unparse(root, format=format), repeat)
+        report('unparse %s' % format, seconds, len(output))
+        seconds = best_of(lambda: write_file(format), repeat)
+        report('unparse_to %s file' % format, seconds, write_file(format))
+        seconds = best_of(lambda: json.loads(output.decode('utf-8')), repeat)
+        report('json.loads %s' % format, seconds)
+
+
+def comment_tables_time(root):
+    t0 = time.time()
+    unparser = xcodeprojer.Unparser(root)
+    unparser.version = int(root['objectVersion'])
+    unparser.projectname = PROJECTNAME
+    unparser.disable_comments = False
+    unparser.create_lookup_tables()
+    for gid in root['objects']:
+        unparser.gid_comment(gid)
+    return time.time() - t0
+
+
+def bench_repeated(text, repeat):
+    """Modify one file and unparse again, like an editor that saves often."""
+    for label, dictionarytype, cache_fragments in [('plain', dict, False),
+                                                   ('tracked', xcodeprojer.TrackedDict, False),
+                                                   ('tracked and cached', xcodeprojer.TrackedDict, True)]:
+        root, parseinfo = xcodeprojer.parse(text, dictionarytype=dictionarytype)
+        xcodeprojer.unparse(root, projectname=PROJECTNAME, cache_fragments=cache_fragments)
+        fileref = find_first(root, 'PBXFileReference')[0]
+        edits = iter(range(1000000))
+
+        def edit():
+            root['objects'][fileref]['path'] = 'edited%d.c' % next(edits)
+
+        def edit_and_unparse():
+            edit()
+            xcodeprojer.unparse(root, projectname=PROJECTNAME, cache_fragments=cache_fragments)
+
+        def edit_and_comments():
+            edit()
+            return comment_tables_time(root)
+
+        report('edit and unparse %s tree' % label, best_of(edit_and_unparse, repeat))
+        report('  lookup tables and comments', min(edit_and_comments() for _ in range(repeat)))
+
+
+def bench_gids(text, repeat):
+    """Generate two gids per file, one by one and in batches."""
+    num = 2 * text.count(b'isa = PBXBuildFile;')
+
+    def one_by_one():
+        clock = xcodeprojer.IDGeneratorClock(0x19b49740)
+        generator = xcodeprojer.UniqueXcodeIDGenerator(username='bench', pid=1, refdatefunc=clock.getseconds)
+        for i in range(num):
+            generator.generate()
+            if i & 0xffff == 0xffff:
+                clock.tick()
+
+    def batched():
+        for _ in xcodeprojer.generate_gid_batches(num, username='bench', pid=1, refdate='2014-09-01T12:00:00Z'):
+            pass
+
+    report('generate %d gids one by one' % num, best_of(one_by_one, repeat))
+    report('generate %d gids in batches' % num, best_of(batched, repeat))
+    identities = [('PBXFileReference', 'file%d.c' % i, 'group') for i in range(num)]
+    report('derive %d gids from identities' % num,
+           best_of(lambda: xcodeprojer.GidAllocator().allocate_for_batch(identities), repeat))
+
+    gids = list(xcodeprojer.generate_gids(num, username='bench', pid=1, refdate='2014-09-01T12:00:00Z'))
+    report('gidfields for every gid', best_of(lambda: [xcodeprojer.gidfields(None, gid) for gid in gids], repeat))
+    report('decode_gids for all gids', best_of(lambda: xcodeprojer.decode_gids(gids), repeat))
+    report('  and format their dates',
+           best_of(lambda: xcodeprojer.format_gid_dates(xcodeprojer.decode_gids(gids).dates), repeat))
+
+
+def bench_catalog(text, repeat):
+    """Catalog a directory with copies of the project, from scratch
+    with and without workers and again when nothing changed.
+    """
+    numprojects = 16
+    tmpdir = tempfile.mkdtemp()
+    try:
+        for i in range(numprojects):
+            prjdir = join(tmpdir, 'Project%d.xcodeproj' % i)
+            os.mkdir(prjdir)
+            with open(join(prjdir, 'project.pbxproj'), 'wb') as f:
+                f.write(text)
+
+        dbfilename = join(tmpdir, 'catalog.db')
+        for workers in [None, 4]:
+            def load():
+                if os.path.exists(dbfilename):
+                    os.remove(dbfilename)
+                xcodeprojer.catalog_projects(dbfilename, [tmpdir], workers=workers)
+
+            report('catalog %d projects with %s workers' % (numprojects, workers or 'no'), best_of(load, repeat))
+        seconds = best_of(lambda: xcodeprojer.catalog_projects(dbfilename, [tmpdir]), repeat)
+        report('catalog %d unchanged projects' % numprojects, seconds, os.path.getsize(dbfilename))
+    finally:
+        shutil.rmtree(tmpdir)
+
+
+def bench_references(text, repeat):
+    """Find the referrers of a file by scanning all objects and with the
+    reference index, which for a tracked tree is updated after an edit.
+    """
+    root, parseinfo = xcodeprojer.parse(text, dictionarytype=xcodeprojer.TrackedDict)
+    fileref = find_first(root, 'PBXFileReference')[0]
+
+    def scan():
+        return [(gid, keypath) for gid, keypath, target in xcodeprojer.iter_references(root['objects'])
+                if target == fileref]
+
+    report('scan all objects for referrers', best_of(scan, repeat))
+    report('build the reference index', best_of(lambda: xcodeprojer.ReferenceIndex(root['objects']), repeat))
+    xcodeprojer.reference_index(root)
+    edits = iter(range(1000000))
+
+    def edit_and_lookup():
+        root['objects'][fileref]['path'] = 'edited%d.c' % next(edits)
+        return xcodeprojer.reference_index(root).referrers(fileref)
+
+    assert edit_and_lookup() == sorted(scan())
+    report('edit and look up referrers in the index', best_of(edit_and_lookup, repeat))
+
+
+def bench_queries(text, repeat):
+    """Look up objects by isa and path a hundred times,
+    by scanning all objects and with the indexes of a Project.
+    """
+    root, parseinfo = xcodeprojer.parse(text, dictionarytype=xcodeprojer.TrackedDict)
+    objects = root['objects']
+    paths = ['file%d.c' % i for i in range(100)]
+
+    def scan():
+        for path in paths:
+            [gid for gid, obj in objects.items() if obj.get('path') == path]
+        [gid for gid, obj in objects.items() if obj.get('isa') == 'PBXNativeTarget']
+
+    def indexed():
+        project = xcodeprojer.Project(root)
+        for path in paths:
+            project.by_path(path)
+        project.by_isa('PBXNativeTarget')
+
+    report('scan for 100 paths', best_of(scan, repeat))
+    report('index and look up 100 paths', best_of(indexed, 1))
+    report('look up 100 paths in the index', best_of(indexed, repeat))
+
+    project = xcodeprojer.Project(root)
+    project.by_isa('PBXFileReference')
+
+    def all_filerefs():
+        for _ in range(100):
+            project.by_isa('PBXFileReference')
+
+    report('look up all file references 100 times', best_of(all_filerefs, repeat))
+
+
+def bench_orphans(text, repeat):
+    """Sweep a project where one in twenty files was removed from its group
+    and its build phase, leaving the file references and build files behind.
+    """
+    root, parseinfo = xcodeprojer.parse(text)
+    objects = root['objects']
+    lost = set()
+    for gid, obj in list(objects.items()):
+        if obj.get('isa') == 'PBXBuildFile' and len(lost) < len(objects) // 40:
+            lost.update([gid, obj['fileRef']])
+    for obj in objects.values():
+        for key in ('children', 'files'):
+            if key in obj:
+                obj[key] = [gid for gid in obj[key] if gid not in lost]
+
+    orphans = xcodeprojer.find_orphans(root)
+    assert set(orphans) == lost
+    report('find %d orphans in %d objects' % (len(orphans), len(objects)),
+           best_of(lambda: xcodeprojer.find_orphans(root), repeat))
+
+
+def bench_integrity(text, repeat):
+    """Check the references of all objects like --lint does."""
+    root, parseinfo = xcodeprojer.parse(text)
+    assert xcodeprojer.check_integrity(root) == []
+    report('check the integrity of %d objects' % len(root['objects']),
+           best_of(lambda: xcodeprojer.check_integrity(root), repeat))
+
+
+def bench_buildsettings(text, repeat):
+    """Resolve the build settings of 300 targets with 3 configurations
+    each ten times, by walking the configuration chains every time and
+    with the memoizing resolver of a tracked Project.
+    """
+    root, parseinfo = xcodeprojer.parse(text, dictionarytype=xcodeprojer.TrackedDict)
+    objects = root['objects']
+    gids = xcodeprojer.generate_gids(2000, username='bench', pid=2, refdate='2014-09-01T12:00:00Z')
+    names = ['Debug', 'Release', 'Profile']
+    settings = dict(('SETTING_%d' % i, 'value%d' % i) for i in range(50))
+
+    def configurationlist():
+        listgid = next(gids)
+        configurations = []
+        for name in names:
+            configurations.append(next(gids))
+            objects[configurations[-1]] = {'isa': 'XCBuildConfiguration', 'name': name,
+                                           'buildSettings': dict(settings)}
+        objects[listgid] = {'isa': 'XCConfigurationList', 'buildConfigurations': configurations}
+        return listgid
+
+    rootobject = root['rootObject']
+    objects[rootobject]['buildConfigurationList'] = configurationlist()
+    targets = []
+    for i in range(300):
+        targets.append(next(gids))
+        objects[targets[-1]] = {'isa': 'PBXNativeTarget', 'name': 'Target%d' % i,
+                                'buildConfigurationList': configurationlist()}
+
+    def walk(gid, name, merged):
+        for configuration in objects[objects[gid]['buildConfigurationList']]['buildConfigurations']:
+            if objects[configuration]['name'] == name:
+                merged.update(objects[configuration]['buildSettings'])
+
+    def walked():
+        for _ in range(10):
+            for target in targets:
+                for name in names:
+                    merged = {}
+                    walk(rootobject, name, merged)
+                    walk(target, name, merged)
+
+    def resolved():
+        project = xcodeprojer.Project(root)
+        for _ in range(10):
+            for target in targets:
+                for name in names:
+                    project.build_settings(target, name)
+
+    report('walk the configurations 9000 times', best_of(walked, repeat))
+    report('resolve the settings 9000 times', best_of(resolved, repeat))
+
+
+def bench_paths(text, repeat):
+    """Resolve the paths of the files after moving them into groups five
+    levels deep, for 10 files by scanning for the parent groups and for
+    all files with the memoized group paths of a Project.
+    """
+    root, parseinfo = xcodeprojer.parse(text)
+    objects = root['objects']
+    gids = xcodeprojer.generate_gids(len(objects), username='bench', pid=3, refdate='2014-09-01T12:00:00Z')
+    _, group = find_first(root, 'PBXGroup')
+    files = [gid for gid in group['children'] if objects[gid].get('path', '').startswith('file')]
+    moved = set(files)
+    group['children'] = [gid for gid in group['children'] if gid not in moved]
+    for i in range(0, len(files), 100):
+        parent = group
+        for depth in range(5):
+            child = next(gids)
+            objects[child] = {'isa': 'PBXGroup', 'path': 'dir%d_%d' % (i, depth),
+                              'sourceTree': '<group>', 'children': []}
+            parent['children'].append(child)
+            parent = objects[child]
+        parent['children'].extend(files[i:i + 100])
+
+    def scan_path(gid):
+        parts = []
+        while gid is not None:
+            parts.append(objects[gid].get('path', ''))
+            gid = next((g for g, obj in objects.items() if gid in obj.get('children', ())), None)
+        return '/'.join(p for p in reversed(parts) if p)
+
+    report('scan the paths of 10 files', best_of(lambda: [scan_path(gid) for gid in files[:10]], 1))
+    report('resolve the paths of %d files' % len(files),
+           best_of(lambda: xcodeprojer.Project(root).full_paths(), repeat))
+
+
+def bench_batch(text, repeat):
+    """Add 50000 files to the project, appending to the lists with a linear
+    membership check for the first 5000 and through a Project batch.
+    """
+    def added(numfiles, use_batch):
+        root, parseinfo = xcodeprojer.parse(text)
+        allocator = xcodeprojer.GidAllocator([root], username='bench', pid=4, refdate='2014-09-01T12:00:00Z')
+        project = xcodeprojer.Project(root)
+        objects = root['objects']
+        group = find_first(root, 'PBXGroup')[0]
+        sources = find_first(root, 'PBXSourcesBuildPhase')[0]
+        t0 = time.time()
+        if use_batch:
+            with project.batch(allocator) as batch:
+                for i in range(numfiles):
+                    batch.add_file('added%d.c' % i, group, buildphase=sources)
+        else:
+            for i in range(numfiles):
+                fileref, buildfile = allocator.allocate_batch(2)
+                objects[fileref] = {'isa': 'PBXFileReference', 'path': 'added%d.c' % i, 'sourceTree': '<group>'}
+                objects[buildfile] = {'isa': 'PBXBuildFile', 'fileRef': fileref}
+                for gid, key, value in ((group, 'children', fileref), (sources, 'files', buildfile)):
+                    if value not in objects[gid][key]:
+                        objects[gid][key].append(value)
+        return time.time() - t0
+
+    report('add 5000 files with list scans', min(added(5000, False) for _ in range(repeat)))
+    report('add 50000 files in a batch', min(added(50000, True) for _ in range(repeat)))
+
+
+def bench_merge(text, repeat):
+    """Merge two versions that each renamed 100 files and added 100 files
+    to the same group, once for the parsed trees and once with parsing
+    the three versions and writing the result.
+    """
+    def modified(side):
+        root, parseinfo = xcodeprojer.parse(text)
+        objects = root['objects']
+        group = find_first(root, 'PBXGroup')[1]
+        filerefs = [gid for gid in group['children'] if objects[gid].get('path', '').startswith('file')]
+        for i, gid in enumerate(filerefs[side::2][:100]):
+            objects[gid]['path'] = '%s%d.c' % (side and 'theirs' or 'ours', i)
+        gids = xcodeprojer.generate_gids(100, username='bench', pid=5 + side, refdate='2014-09-01T12:00:00Z')
+        for i, gid in enumerate(gids):
+            objects[gid] = {'isa': 'PBXFileReference', 'path': 'added%d_%d.c' % (side, i), 'sourceTree': '<group>'}
+            group['children'].append(gid)
+        return root, xcodeprojer.unparse(root, projectname=PROJECTNAME)
+
+    base, parseinfo = xcodeprojer.parse(text)
+    (ours, ourtext), (theirs, theirtext) = modified(0), modified(1)
+    root, conflicts = xcodeprojer.merge_roots(base, ours, theirs)
+    assert conflicts == [] and len(root['objects']) == len(base['objects']) + 200
+
+    report('merge the trees', best_of(lambda: xcodeprojer.merge_roots(base, ours, theirs), repeat))
+    report('parse, merge and unparse', best_of(lambda: xcodeprojer.merge(text, ourtext, theirtext, PROJECTNAME), 1))
+
+
+def bench_structdiff(text, repeat):
+    """Diff the project against a copy with 100 renamed files,
+    as text with difflib and structurally by the objects.
+    """
+    a, parseinfo = xcodeprojer.parse(text)
+    b, parseinfo = xcodeprojer.parse(text)
+    objects = b['objects']
+    filerefs = [gid for gid, obj in objects.items() if obj.get('isa') == 'PBXFileReference']
+    for i, gid in enumerate(filerefs[::max(1, len(filerefs) // 100)][:100]):
+        objects[gid]['path'] = 'renamed%d.c' % i
+    othertext = xcodeprojer.unparse(b, projectname=PROJECTNAME)
+    alines, blines = xcodeprojer.unilines(text), xcodeprojer.unilines(othertext)
+
+    report('text diff with difflib', best_of(lambda: list(difflib.unified_diff(alines, blines)), 1))
+    assert len(xcodeprojer.diff_roots(a, b)) == 100
+    report('structural diff', best_of(lambda: xcodeprojer.diff_roots(a, b), repeat))
+
+
+def bench_textdiff(text, repeat):
+    """Diff the project text against a copy like a failed lint of a
+    third-party project: half of the lines indented with spaces and one
+    line in fifty removed or duplicated elsewhere. Compare difflib with
+    the patience diff behind print_diff.
+    """
+    a = xcodeprojer.unilines(text)
+    rnd = random.Random(1)
+    b = [line.replace('\t', '    ') if rnd.random() < 0.5 else line for line in a]
+    for _ in range(len(a) // 50):
+        pos = rnd.randrange(len(b))
+        if rnd.random() < 0.5:
+            del b[pos]
+        else:
+            b.insert(pos, rnd.choice(a))
+
+    report('unified diff with difflib', best_of(lambda: list(difflib.unified_diff(a, b)), 1))
+    report('unified diff with patience diff', best_of(lambda: list(xcodeprojer.unified_diff(a, b)), repeat))
+    report('html diff with difflib', best_of(lambda: difflib.HtmlDiff(tabsize=4).make_file(a, b, context=True), 1))
+    report('html diff with patience diff', best_of(lambda: xcodeprojer.html_diff(a, b), repeat))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Time xcodeprojer on large synthetic projects.')
+    parser.add_argument('-n', '--files', type=int, default=DEFAULT_FILES, help='number of source files to add to the project')
+    parser.add_argument('-r', '--repeat', type=int, default=3, help='report the best of this many runs')
+    parser.add_argument('--sort', action='store_true', help='unparse with canonical and shuffled object order')
+    parser.add_argument('--parallel', action='store_true', help='unparse with several worker processes')
+    parser.add_argument('--xml', action='store_true', help='write the XML plist format')
+    parser.add_argument('--json', action='store_true', help='write the indented and the compact JSON format')
+    parser.add_argument('--repeated', action='store_true', help='unparse the same tree after small modifications')
+    parser.add_argument('--gids', action='store_true', help='generate and decode two gids for every file')
+    parser.add_argument('--catalog', action='store_true', help='load copies of the project into a catalog database')
+    parser.add_argument('--references', action='store_true', help='find the objects that refer to a file')
+    parser.add_argument('--queries', action='store_true', help='find objects by isa and path')
+    parser.add_argument('--orphans', action='store_true', help='find the objects that are unreachable from the rootObject')
+    parser.add_argument('--integrity', action='store_true', help='check the references like --lint does')
+    parser.add_argument('--buildsettings', action='store_true', help='resolve the build settings of many targets')
+    parser.add_argument('--paths', action='store_true', help='resolve the paths of all files through the groups')
+    parser.add_argument('--batch', action='store_true', help='add 50000 files with one batch')
+    parser.add_argument('--merge', action='store_true', help='merge two modified versions of the project')
+    parser.add_argument('--structdiff', action='store_true', help='diff two versions of the project by their objects')
+    parser.add_argument('--textdiff', action='store_true', help='diff the text of the project against a changed copy')
+    parser.add_argument('--profile', action='store_true', help='run everything through the profiler')
+
+    args = parser.parse_args()
+
+    if args.profile:
+        print('Profiling...')
+        utils.profile('call_command(args, parser)', locals(), globals())
+    else:
+        call_command(args, parser)
+
+
+def call_command(args, parser):
+    benchmarks = [(args.sort, bench_sort),
+                  (args.parallel, bench_parallel),
+                  (args.xml, bench_xml),
+                  (args.json, bench_json),
+                  (args.repeated, bench_repeated),
+                  (args.gids, bench_gids),
+                  (args.catalog, bench_catalog),
+                  (args.references, bench_references),
+                  (args.queries, bench_queries),
+                  (args.orphans, bench_orphans),
+                  (args.integrity, bench_integrity),
+                  (args.buildsettings, bench_buildsettings),
+                  (args.paths, bench_paths),
+                  (args.batch, bench_batch),
+                  (args.merge, bench_merge),
+                  (args.structdiff, bench_structdiff),
+                  (args.textdiff, bench_textdiff)]
+    if not any(enabled for enabled, _ in benchmarks):
+        parser.error('Please specify at least one benchmark.')
+
+    t0 = time.time()
+    text = synthetic_project(args.files)
+    report('create project with %d files' % args.files, time.time() - t0, len(text))
+
+    for enabled, bench in benchmarks:
+        if enabled:
+            bench(text, args.repeat)
+
+
+if __name__ == '__main__':
+    if PY3:
+        sys.stdout = codecs.getwriter('utf8')(sys.stdout.buffer)
+        sys.stderr = codecs.getwriter('utf8')(sys.stderr.buffer)
+    main()
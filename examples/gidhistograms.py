@@ -12,6 +12,7 @@ from __future__ import print_function
 
 import sys
 import argparse
+import datetime
 from os.path import abspath, dirname, join
 import multiprocessing
 from collections import defaultdict, Counter
@@ -170,11 +171,7 @@ def gidtable(filename):
         xcodeproj = f.read()
         root, parseinfo = xcodeprojer.parse(xcodeproj)
         if root is not None:
-            unparser = xcodeprojer.Unparser(root)
-            # We don't need the parse tree, only access to the gidcomments
-            # that are built during the unparse.
-            _ = unparser.unparse(root, projectname=xcodeprojer.projectname_for_path(filename))
-            gidcomments = unparser.gidcomments
+            gidcomments = xcodeprojer.gid_comments(root, projectname=xcodeprojer.projectname_for_path(filename)) or {}
             c = '.'
         else:
             gidcomments = {}
@@ -184,6 +181,17 @@ def gidtable(filename):
         return filename, gidcomments
 
 
+years_by_day = {}
+
+
+def year_of_day(day):
+    """The year of the day since 1970, looked up once per day."""
+    year = years_by_day.get(day)
+    if year is None:
+        year = years_by_day[day] = datetime.datetime.utcfromtimestamp(day * 86400).year
+    return year
+
+
 def histogram(args, utcoffset=0):
     if args.emoji or args.emojitable:
         write("Please be patient when your computer is caching emoji fonts for you. This might take a minute.\n")
@@ -215,15 +223,14 @@ def histogram(args, utcoffset=0):
     try:
         for asyncresult in results:
             filename, gids = asyncresult.get()
-            for gid in gids:
-                fields = xcodeprojer.gidfields(gids, gid)
-                refdate = fields['date']
-                dt = xcodeprojer.datetime_from_utc(refdate)
-                histo_hour[dt.hour] += 1
-                year = dt.year
+            columns = xcodeprojer.decode_gids(gid for gid in gids if xcodeprojer.is_hex_global_id(gid))
+            for user, date in zip(columns.users, columns.dates):
+                epoch = xcodeprojer.UniqueXcodeIDGenerator.reftime_to_epoch(date)
+                histo_hour[epoch // 3600 % 24] += 1
+                year = year_of_day(epoch // 86400)
                 if args.startyear <= year <= args.endyear:
                     histo_year[year] += 1
-                    users_per_year[year].add(fields['user'])
+                    users_per_year[year].add(user)
     except (KeyboardInterrupt, GeneratorExit):
         pool.terminate()
     finally:
@@ -20,8 +20,15 @@ from os.path import abspath, dirname, splitext
 import calendar as cal
 import re
 import argparse
-from io import StringIO
+from io import StringIO, BytesIO
 import json
+import random
+import difflib
+import pickle
+import tempfile
+import shutil
+import sqlite3
+from collections import OrderedDict
 
 # Set up the Python path so we find the xcodeprojer module in the parent directory
 # relative to this file.
@@ -179,6 +186,13 @@ def run_args(*args):
     return ret, outbuf.getvalue(), errbuf.getvalue()
 
 
+def run_process(args):
+    """Run xcodeprojer as a command and return its exit code."""
+    script = os.path.splitext(xcodeprojer.__file__)[0] + '.py'
+    with open(os.devnull, 'wb') as devnull:
+        return subprocess.call([sys.executable, script] + args, stdout=devnull, stderr=devnull)
+
+
 class ParserTestCase(unittest.TestCase):
 
     XML_TEMPLATE = """<?xml version="1.0" encoding="UTF-8"?>
@@ -368,6 +382,520 @@ class IntlTestCase(unittest.TestCase):
             self.assertIsNone(root)
 
 
+class UnparserTestCase(unittest.TestCase):
+
+    def test_unsorted_input(self):
+        prj, filename = read_mini_project()
+        prjname = xcodeprojer.projectname_for_path(filename)
+        root, parseinfo = parse(prj, dictionarytype=OrderedDict)
+        self.assertEqual(unparse(root, projectname=prjname), prj)
+
+        items = list(root['objects'].items())
+        random.Random(0).shuffle(items)
+        root['objects'] = OrderedDict((k, OrderedDict(sorted(v.items(), reverse=True)))
+                                      for k, v in items)
+        self.assertEqual(unparse(root, projectname=prjname), prj)
+
+    def test_parallel_unparse(self):
+        for prj, filename in [read_intl_project(), read_mini_project()]:
+            prjname = xcodeprojer.projectname_for_path(filename)
+            root, parseinfo = parse(prj)
+            self.assertEqual(unparse(root, projectname=prjname, workers=2), prj)
+
+    def test_unparse_to(self):
+        prj, filename = read_intl_project()
+        root, parseinfo = parse(prj)
+        xmltext = read_file(os.path.join(dirname(filename), 'project.xml'))
+        buf = BytesIO()
+        numbytes = xcodeprojer.unparse_to(buf, root, format='xml')
+        self.assertEqual(buf.getvalue(), xmltext)
+        self.assertEqual(numbytes, len(xmltext))
+
+        class SmallChunksUnparser(xcodeprojer.Unparser):
+            chunk_fragments = 7
+
+        prjname = xcodeprojer.projectname_for_path(filename)
+        expected = bytestr(prj)
+        self.assertEqual(SmallChunksUnparser(root).unparse(root, projectname=prjname), expected)
+        buf = BytesIO()
+        numbytes = SmallChunksUnparser(root).unparse_to(buf, root, projectname=prjname)
+        self.assertEqual(buf.getvalue(), expected)
+        self.assertEqual(numbytes, len(expected))
+
+    def test_unparse_returns_bytes(self):
+        prj, filename = read_mini_project()
+        root, parseinfo = parse(prj)
+        for format, unparserclass in xcodeprojer.unparsers.items():
+            output = unparserclass(root).unparse(root, projectname='MiniProject')
+            self.assertIsInstance(output, bytes)
+            self.assertEqual(output, xcodeprojer.unparse(root, format=format, projectname='MiniProject'))
+
+    def test_unparse_in_chunks(self):
+        prj, filename = read_intl_project()
+        root, parseinfo = parse(prj)
+        for unparserclass, attr, size in [(xcodeprojer.XMLUnparser, 'chunk_fragments', 7),
+                                          (xcodeprojer.JSONUnparser, 'chunk_fragments', 7),
+                                          (xcodeprojer.CompactJSONUnparser, 'chunk_objects', 3)]:
+            smallchunks = type('SmallChunks' + unparserclass.__name__, (unparserclass,), {attr: size})
+            self.assertEqual(smallchunks(root).unparse(root), unparserclass(root).unparse(root))
+            buf = BytesIO()
+            smallchunks(root).unparse_to(buf, root)
+            self.assertEqual(buf.getvalue(), unparserclass(root).unparse(root))
+
+    def test_json_output(self):
+        prj, filename = read_intl_project()
+        root, parseinfo = parse(prj)
+        jsontext = read_file(os.path.join(dirname(filename), 'project.json'))
+        buf = BytesIO()
+        xcodeprojer.unparse_to(buf, root, format='json')
+        self.assertEqual(buf.getvalue(), jsontext)
+
+        compact = xcodeprojer.unparse(root, format='json-compact')
+        self.assertEqual(compact, bytestr(json.dumps(root, sort_keys=True, separators=(',', ':'))))
+        buf = BytesIO()
+        xcodeprojer.unparse_to(buf, root, format='json-compact')
+        self.assertEqual(buf.getvalue(), compact)
+        self.assertEqual(parse(compact)[0], root)
+
+    def test_xml_escape(self):
+        escape = xcodeprojer.XMLUnparser.escape_tag_entities
+        self.assertEqual(escape(u('<group> & "more"')), u('&lt;group&gt; &amp; "more"'))
+        self.assertEqual(escape(u('main.c')), u('main.c'))
+
+
+class TrackingTestCase(unittest.TestCase):
+
+    def test_unmodified(self):
+        prj, filename = read_mini_project()
+        prj = bytestr(prj)
+        prjname = xcodeprojer.projectname_for_path(filename)
+        root, parseinfo = parse(prj, dictionarytype=xcodeprojer.TrackedDict)
+        self.assertFalse(xcodeprojer.is_modified(root))
+        self.assertEqual(xcodeprojer.unparse(root, projectname=prjname), prj)
+        # The second unparse of the unmodified canonical project returns the original.
+        self.assertIs(xcodeprojer.unparse(root, projectname=prjname), root.tracker.source)
+        self.assertTrue(xcodeprojer.is_modified(sparse(prj)[0]))
+
+    def test_modifications(self):
+        prj, filename = read_mini_project()
+        prjname = xcodeprojer.projectname_for_path(filename)
+        root, parseinfo = parse(prj, dictionarytype=xcodeprojer.TrackedDict)
+        tracker = root.tracker
+        objects = root['objects']
+        group = objects['4CDE96A419B3613C009DF310']
+        group['children'].append('4CDE96A619B3613C009DF310')
+        self.assertTrue(xcodeprojer.is_modified(root))
+        self.assertEqual(tracker.changed_since(0), set(['4CDE96A419B3613C009DF310']))
+
+        version = tracker.version
+        objects['4CDE96A619B3613C009DF399'] = {'isa': 'PBXBuildFile', 'settings': {'ATTRIBUTES': []}}
+        objects['4CDE96A619B3613C009DF399']['settings']['ATTRIBUTES'].append('Weak')
+        del root['classes']
+        self.assertEqual(tracker.changed_since(version), set(['4CDE96A619B3613C009DF399', None]))
+        self.assertIsInstance(objects['4CDE96A619B3613C009DF399']['settings'], xcodeprojer.TrackedDict)
+        self.assertNotEqual(unparse(root, projectname=prjname), prj)
+
+        plain = pickle.loads(pickle.dumps(root))
+        self.assertIs(type(plain['objects']), dict)
+        self.assertEqual(plain, root)
+
+    def test_incremental_unparse(self):
+        prj, filename = read_mini_project()
+        prjname = xcodeprojer.projectname_for_path(filename)
+        root, parseinfo = parse(prj, dictionarytype=xcodeprojer.TrackedDict)
+        objects = root['objects']
+
+        def check():
+            expected = unparse(pickle.loads(pickle.dumps(root)), projectname=prjname)
+            self.assertEqual(unparse(root, projectname=prjname), expected)
+            self.assertEqual(unparse(root, projectname=prjname, cache_fragments=True), expected)
+            return expected
+
+        self.assertEqual(check(), prj)
+        objects['4CDE96A519B3613C009DF310']['path'] = 'renamed.c'
+        self.assertTrue(check().find('4CDE96A619B3613C009DF310 /* renamed.c in Sources */') >= 0)
+        objects['4CDE969E19B3613C009DF310']['name'] = 'Compile'
+        self.assertTrue(check().find('/* renamed.c in Compile */') >= 0)
+        objects['4CDE96A119B3613C009DF310']['name'] = 'Tool'
+        self.assertTrue(check().find('Build configuration list for PBXNativeTarget "Tool"') >= 0)
+        objects['4CDE969E19B3613C009DF310']['files'].pop()
+        objects['4CDE969F19B3613C009DF310']['files'].append('4CDE96A619B3613C009DF310')
+        self.assertTrue(check().find('/* renamed.c in Frameworks */') >= 0)
+        del objects['4CDE96A519B3613C009DF310']
+        check()
+        objects['4CDE96A519B3613C009DF310'] = {'isa': 'PBXFileReference', 'path': 'new.c', 'sourceTree': '<group>'}
+        self.assertTrue(check().find('/* new.c in Frameworks */') >= 0)
+        root['objectVersion'] = '45'
+        check()
+
+
+class IndexTestCase(unittest.TestCase):
+
+    def mini_projects(self):
+        """Yield the MiniProject once made of plain dicts
+        and once of TrackedDicts.
+        """
+        prj, filename = read_mini_project()
+        for dictionarytype in [dict, xcodeprojer.TrackedDict]:
+            root, parseinfo = parse(prj, dictionarytype=dictionarytype)
+            yield xcodeprojer.Project(root)
+
+    def modified(self, project, *gids):
+        """Plain dicts need to be told which objects changed,
+        TrackedDicts report their changes themselves.
+        """
+        if getattr(project.objects, 'tracker', None) is None:
+            for gid in gids:
+                project.invalidate(gid)
+
+    def test_reference_index(self):
+        prj, filename = read_mini_project()
+        root, parseinfo = parse(prj, dictionarytype=xcodeprojer.TrackedDict)
+        objects = root['objects']
+        index = xcodeprojer.reference_index(root)
+        self.assertEqual(index.referrers('4CDE96A519B3613C009DF310'),
+                         [('4CDE96A419B3613C009DF310', 'children'), ('4CDE96A619B3613C009DF310', 'fileRef')])
+        self.assertEqual(index.references('4CDE96A619B3613C009DF310'), [('fileRef', '4CDE96A519B3613C009DF310')])
+
+        def check():
+            index = xcodeprojer.reference_index(root)
+            self.assertIs(index, root.tracker.indexes['references'])
+            self.assertEqual(index.referrers_of, xcodeprojer.ReferenceIndex(objects).referrers_of)
+            return index
+
+        objects['4CDE96A419B3613C009DF310']['children'].remove('4CDE96A519B3613C009DF310')
+        del objects['4CDE96A619B3613C009DF310']
+        self.assertEqual(check().referrers('4CDE96A519B3613C009DF310'), [])
+        objects['4CDE96A619B3613C009DF399'] = {'isa': 'PBXBuildFile', 'fileRef': '4CDE96A519B3613C009DF310'}
+        self.assertEqual(check().referrers('4CDE96A519B3613C009DF310'), [('4CDE96A619B3613C009DF399', 'fileRef')])
+        root['objects'] = dict(objects)
+        objects = root['objects']
+        check()
+
+    def test_project_queries(self):
+        for project in self.mini_projects():
+            self.assertEqual(project.by_isa('PBXNativeTarget'), ('4CDE96A119B3613C009DF310',))
+            self.assertEqual(project.by_path('main.c'), ('4CDE96A519B3613C009DF310',))
+            self.assertEqual(project.by_name('MiniProject'), ('4CDE96A119B3613C009DF310',))
+            self.assertEqual(project.by_isa('PBXAggregateTarget'), ())
+            filerefs = project.by_isa('PBXFileReference')
+            self.assertIs(project.by_isa('PBXFileReference'), filerefs)
+
+            objects = project.objects
+            objects['4CDE96A519B3613C009DF310']['path'] = 'renamed.c'
+            objects['4CDE96A519B3613C009DF399'] = {'isa': 'PBXFileReference', 'path': 'main.c'}
+            self.modified(project, '4CDE96A519B3613C009DF310', '4CDE96A519B3613C009DF399')
+            self.assertEqual(project.by_path('main.c'), ('4CDE96A519B3613C009DF399',))
+            self.assertEqual(project.by_path('renamed.c'), ('4CDE96A519B3613C009DF310',))
+            self.assertEqual(project.by_isa('PBXFileReference'), tuple(sorted(filerefs + ('4CDE96A519B3613C009DF399',))))
+            self.assertEqual(project.referrers('4CDE96A519B3613C009DF310'),
+                             [('4CDE96A419B3613C009DF310', 'children'), ('4CDE96A619B3613C009DF310', 'fileRef')])
+
+    def test_build_settings(self):
+        target = '4CDE96A119B3613C009DF310'
+        for project in self.mini_projects():
+            self.assertEqual(project.configuration_names(target), ['Debug'])
+            settings = project.build_settings(target, 'Debug')
+            self.assertEqual(settings['PRODUCT_NAME'], '$(TARGET_NAME)')
+            self.assertEqual(settings['ALWAYS_SEARCH_USER_PATHS'], 'NO')
+            self.assertIs(project.build_settings(target, 'Debug'), settings)
+            self.assertNotIn('PRODUCT_NAME', project.build_settings(None, 'Debug'))
+            self.assertEqual(project.build_settings(target, 'Release'), {})
+
+            objects = project.objects
+            objects['4CDE96AA19B3613C009DF310']['buildSettings']['ALWAYS_SEARCH_USER_PATHS'] = 'YES'
+            objects['4CDE96A719B3613C009DF310']['baseConfigurationReference'] = '4CDE96A519B3613C009DF310'
+            self.modified(project, '4CDE96AA19B3613C009DF310', '4CDE96A719B3613C009DF310')
+            xcconfigs = {'4CDE96A519B3613C009DF310': {'SDKROOT': 'macosx', 'ONLY_ACTIVE_ARCH': 'YES'}}
+            settings = project.build_settings(target, 'Debug', xcconfig=xcconfigs.get)
+            self.assertEqual(settings['ALWAYS_SEARCH_USER_PATHS'], 'YES')
+            self.assertEqual(settings['SDKROOT'], 'macosx10.9')
+            self.assertEqual(settings['ONLY_ACTIVE_ARCH'], 'YES')
+
+    def test_full_paths(self):
+        for project in self.mini_projects():
+            self.assertEqual(project.full_paths(), {'4CDE96A219B3613C009DF310': '$(BUILT_PRODUCTS_DIR)/MiniProject',
+                                                    '4CDE96A519B3613C009DF310': 'MiniProject/main.c'})
+            self.assertIsNone(project.full_path('4CDE96A619B3613C009DF310'))
+
+            objects = project.objects
+            objects['4CDE96A419B3613C009DF310']['path'] = 'Sources'
+            objects['4CDE96A519B3613C009DF399'] = {'isa': 'PBXFileReference', 'path': '../Shared/util.c',
+                                                   'sourceTree': '<group>'}
+            objects['4CDE96A419B3613C009DF310']['children'].append('4CDE96A519B3613C009DF399')
+            self.modified(project, '4CDE96A419B3613C009DF310', '4CDE96A519B3613C009DF399')
+            self.assertEqual(project.full_path('4CDE96A519B3613C009DF310'), 'Sources/main.c')
+            self.assertEqual(project.full_path('4CDE96A519B3613C009DF399'), 'Shared/util.c')
+
+    def test_move_between_groups(self):
+        group, mainc, sub = '4CDE96A419B3613C009DF310', '4CDE96A519B3613C009DF310', '4CDE96A419B3613C009DF399'
+        for project in self.mini_projects():
+            self.assertEqual(project.full_path(mainc), 'MiniProject/main.c')
+            objects = project.objects
+            objects[sub] = {'isa': 'PBXGroup', 'children': [mainc], 'path': 'Sub', 'sourceTree': '<group>'}
+            self.modified(project, sub)
+            objects[group]['children'].remove(mainc)
+            objects[group]['children'].append(sub)
+            self.modified(project, group)
+            self.assertEqual(project.full_path(mainc), 'MiniProject/Sub/main.c')
+            self.assertEqual(project.full_paths(), xcodeprojer.Project(project.root).full_paths())
+
+            objects[group]['children'].append(mainc)
+            self.modified(project, group)
+            del objects[sub]
+            objects[group]['children'].remove(sub)
+            self.modified(project, sub, group)
+            self.assertEqual(project.full_path(mainc), 'MiniProject/main.c')
+            self.assertEqual(project.full_paths(), xcodeprojer.Project(project.root).full_paths())
+
+    def test_batch(self):
+        group = '4CDE96A419B3613C009DF310'
+        for project in self.mini_projects():
+            root = project.root
+            sources = project.by_isa('PBXSourcesBuildPhase')[0]
+            self.assertEqual(project.by_path('new.c'), ())
+            allocator = xcodeprojer.GidAllocator([root], username='test', pid=1)
+            with project.batch(allocator) as batch:
+                filegid, buildgid = batch.add_file('new.c', group, buildphase=sources)
+                self.assertFalse(batch.append(group, 'children', filegid))
+                self.assertFalse(batch.append(group, 'children', '4CDE96A519B3613C009DF310'))
+                batch.remove_object('4CDE96A619B3613C009DF310')
+                self.assertNotIn(filegid, project.objects)
+            objects = project.objects
+            self.assertEqual(project.by_path('new.c'), (filegid,))
+            self.assertEqual(objects[group]['children'], ['4CDE96A519B3613C009DF310', filegid])
+            self.assertEqual(objects[sources]['files'], [buildgid])
+            self.assertEqual(project.referrers(filegid), sorted([(buildgid, 'fileRef'), (group, 'children')]))
+            self.assertEqual(xcodeprojer.check_integrity(root), [])
+
+            with self.assertRaises(KeyError):
+                with project.batch(allocator) as batch:
+                    batch.add_file('other.c', group)
+                    batch.append('4CDE96A519B3613C009DF399', 'children', filegid)
+            self.assertEqual(project.by_path('other.c'), ())
+
+    def test_batch_append_again(self):
+        prj, filename = read_mini_project()
+        root, parseinfo = parse(prj)
+        project = xcodeprojer.Project(root)
+        group, mainc = '4CDE96A419B3613C009DF310', '4CDE96A519B3613C009DF310'
+        with project.batch() as batch:
+            batch.append(group, 'children', 'new')
+            self.assertTrue(batch.remove(group, 'children', 'new'))
+            self.assertTrue(batch.append(group, 'children', 'new'))
+            batch.remove(group, 'children', mainc)
+            batch.append(group, 'children', mainc)
+        self.assertEqual(project.objects[group]['children'], [mainc, 'new'])
+
+    def test_orphans(self):
+        prj, filename = read_mini_project()
+        root, parseinfo = parse(prj)
+        self.assertEqual(xcodeprojer.find_orphans(root), [])
+
+        objects = root['objects']
+        objects['4CDE96A419B3613C009DF310']['children'].remove('4CDE96A519B3613C009DF310')
+        find_isa(objects, 'PBXSourcesBuildPhase')['files'].remove('4CDE96A619B3613C009DF310')
+        objects['4CDE96A519B3613C009DF399'] = {'isa': 'PBXGroup', 'children': ['4CDE96A519B3613C009DF398']}
+        objects['4CDE96A519B3613C009DF398'] = {'isa': 'PBXGroup', 'children': ['4CDE96A519B3613C009DF399']}
+        orphans = ['4CDE96A519B3613C009DF310', '4CDE96A519B3613C009DF398',
+                   '4CDE96A519B3613C009DF399', '4CDE96A619B3613C009DF310']
+        self.assertEqual(xcodeprojer.Project(root).orphans(), orphans)
+        self.assertEqual(xcodeprojer.remove_orphans(root), orphans)
+        self.assertEqual(xcodeprojer.find_orphans(root), [])
+        self.assertFalse(any(gid in objects for gid in orphans))
+
+    def test_check_integrity(self):
+        prj, filename = read_intl_project()
+        root, parseinfo = parse(prj)
+        self.assertEqual(xcodeprojer.check_integrity(root), [])
+
+        prj, filename = read_mini_project()
+        root, parseinfo = parse(prj)
+        objects = root['objects']
+        del objects['4CDE96A519B3613C009DF310']
+        del objects['4CDE96A619B3613C009DF310']['isa']
+        self.assertEqual(xcodeprojer.check_integrity(root), [
+            ('4CDE96A419B3613C009DF310', 'children', 'the referenced object 4CDE96A519B3613C009DF310 is missing'),
+            ('4CDE96A619B3613C009DF310', 'fileRef', 'the referenced object 4CDE96A519B3613C009DF310 is missing'),
+            ('4CDE96A619B3613C009DF310', 'isa', 'the object has no isa')])
+
+
+class MergeTestCase(unittest.TestCase):
+
+    def versions(self):
+        prj, filename = read_mini_project()
+        roots = [parse(prj)[0] for _ in range(3)]
+        base, ours, theirs = roots
+        group, main = '4CDE96A419B3613C009DF310', '4CDE96A519B3613C009DF310'
+        for root, name, gid in ((ours, 'ours.c', '4CDE96A519B3613C009DF391'),
+                                (theirs, 'theirs.c', '4CDE96A519B3613C009DF392')):
+            root['objects'][gid] = {'isa': 'PBXFileReference', 'path': name, 'sourceTree': '<group>'}
+            root['objects'][group]['children'].append(gid)
+        theirs['objects'][group]['children'].insert(0, '4CDE96A519B3613C009DF393')
+        theirs['objects']['4CDE96A519B3613C009DF393'] = {'isa': 'PBXFileReference', 'path': 'first.c',
+                                                         'sourceTree': '<group>'}
+        ours['objects'][main]['path'] = 'renamed.c'
+        theirs['objects'][main]['lastKnownFileType'] = 'sourcecode.cpp.cpp'
+        return prj, roots
+
+    def test_merge_roots(self):
+        prj, (base, ours, theirs) = self.versions()
+        root, conflicts = xcodeprojer.merge_roots(base, ours, theirs)
+        self.assertEqual(conflicts, [])
+        objects = root['objects']
+        self.assertEqual(objects['4CDE96A419B3613C009DF310']['children'],
+                         ['4CDE96A519B3613C009DF393', '4CDE96A519B3613C009DF310',
+                          '4CDE96A519B3613C009DF391', '4CDE96A519B3613C009DF392'])
+        self.assertEqual(objects['4CDE96A519B3613C009DF310']['path'], 'renamed.c')
+        self.assertEqual(objects['4CDE96A519B3613C009DF310']['lastKnownFileType'], 'sourcecode.cpp.cpp')
+        self.assertEqual(xcodeprojer.check_integrity(root), [])
+
+        theirs['objects']['4CDE96A519B3613C009DF310']['path'] = 'other.c'
+        del ours['objects']['4CDE96A619B3613C009DF310']
+        theirs['objects']['4CDE96A619B3613C009DF310']['settings'] = {'COMPILER_FLAGS': '-O3'}
+        root, conflicts = xcodeprojer.merge_roots(base, ours, theirs)
+        self.assertEqual(conflicts, [('4CDE96A519B3613C009DF310', 'path', 'modified differently by ours and theirs'),
+                                     ('4CDE96A619B3613C009DF310', '', 'removed by ours and modified by theirs')])
+        self.assertEqual(root['objects']['4CDE96A519B3613C009DF310']['path'], 'renamed.c')
+        self.assertIn('4CDE96A619B3613C009DF310', root['objects'])
+
+    def test_merge_driver(self):
+        prj, roots = self.versions()
+        filenames = []
+        try:
+            for root in roots:
+                fd, tmpfilename = tempfile.mkstemp(suffix='.pbxproj')
+                os.close(fd)
+                filenames.append(tmpfilename)
+                with open(tmpfilename, 'wb') as f:
+                    f.write(xcodeprojer.unparse(root, projectname='MiniProject'))
+            ret, outtxt, errtxt = run_args(['--merge'] + filenames)
+            self.assertEqual(ret, xcodeprojer.OK)
+            self.assertEqual(outtxt, '')
+            merged = unistr(read_file(filenames[1]))
+            self.assertIn('4CDE96A519B3613C009DF392 /* theirs.c */,', merged)
+            self.assertIn('4CDE96A519B3613C009DF310 /* renamed.c */ = {isa = PBXFileReference; '
+                          'lastKnownFileType = sourcecode.cpp.cpp;', merged)
+            self.assertIn('Build configuration list for PBXProject "MiniProject"', merged)
+            self.assertEqual(xcodeprojer.merge(*[read_file(f) for f in (filenames[0], filenames[1], filenames[1])],
+                                               projectname='MiniProject'), (bytestr(merged), []))
+
+            # git only sees a conflict through the exit code of the process.
+            theirs = roots[2]
+            theirs['objects']['4CDE96A519B3613C009DF310']['path'] = 'other.c'
+            with open(filenames[2], 'wb') as f:
+                f.write(xcodeprojer.unparse(theirs, projectname='MiniProject'))
+            self.assertEqual(run_process(['--merge'] + filenames), xcodeprojer.MERGE_CONFLICTS)
+            self.assertIn('4CDE96A519B3613C009DF310 /* renamed.c */', unistr(read_file(filenames[1])))
+        finally:
+            for filename in filenames:
+                os.remove(filename)
+
+
+class StructuralDiffTestCase(unittest.TestCase):
+
+    def test_diff_roots(self):
+        prj, filename = read_mini_project()
+        a, b = parse(prj)[0], parse(prj)[0]
+        self.assertEqual(xcodeprojer.diff_roots(a, b), [])
+
+        objects = b['objects']
+        objects['4CDE96A519B3613C009DF310']['path'] = 'renamed.c'
+        objects['4CDE96AA19B3613C009DF310']['buildSettings']['SDKROOT'] = 'macosx'
+        del objects['4CDE96A619B3613C009DF310']
+        objects['4CDE96A519B3613C009DF399'] = {'isa': 'PBXFileReference', 'path': 'new.c', 'sourceTree': '<group>'}
+        b['objectVersion'] = '47'
+        changes = xcodeprojer.diff_roots(a, b)
+        self.assertEqual([c[:3] for c in changes],
+                         [('modified', '', 'objectVersion'),
+                          ('modified', '4CDE96A519B3613C009DF310', 'path'),
+                          ('added', '4CDE96A519B3613C009DF399', ''),
+                          ('removed', '4CDE96A619B3613C009DF310', ''),
+                          ('modified', '4CDE96AA19B3613C009DF310', 'buildSettings.SDKROOT')])
+        self.assertEqual(changes[1].old, 'main.c')
+        self.assertEqual(changes[1].new, 'renamed.c')
+
+        fp = StringIO()
+        xcodeprojer.print_structural_diff(changes, a, b, format='summary', fp=fp)
+        self.assertEqual(fp.getvalue(), '1 objects added, 1 removed, 3 modified\n'
+                                        '(project): 1 modified\n'
+                                        'PBXBuildFile: 1 removed\n'
+                                        'PBXFileReference: 1 added, 1 modified\n'
+                                        'XCBuildConfiguration: 1 modified\n')
+        fp = StringIO()
+        xcodeprojer.print_structural_diff(changes, a, b, format='json', fp=fp)
+        self.assertEqual(json.loads(fp.getvalue())[1],
+                         {'change': 'modified', 'gid': '4CDE96A519B3613C009DF310', 'keypath': 'path',
+                          'old': 'main.c', 'new': 'renamed.c'})
+
+    def test_diff_text(self):
+        prj, filename = read_mini_project()
+        root, parseinfo = parse(prj)
+        root['objects']['4CDE96A519B3613C009DF310']['path'] = 'renamed.c'
+        fd, tmpfilename = tempfile.mkstemp(suffix='.pbxproj')
+        os.close(fd)
+        try:
+            with open(tmpfilename, 'wb') as f:
+                f.write(xcodeprojer.unparse(root, projectname='MiniProject'))
+            ret, outtxt, errtxt = run_args(['--diff', filename, tmpfilename])
+            self.assertEqual(ret, xcodeprojer.DIFF_DIFFERENCES)
+            self.assertEqual(outtxt, '--- %s\n+++ %s\n'
+                                     '@@ 4CDE96A519B3613C009DF310 /* renamed.c */ PBXFileReference @@\n'
+                                     '-path = main.c\n'
+                                     '+path = renamed.c\n' % (filename, tmpfilename))
+            ret, outtxt, errtxt = run_args(['--diff', filename, filename])
+            self.assertEqual((ret, outtxt), (xcodeprojer.OK, ''))
+
+            # A project without an objectVersion has no comments.
+            del root['objectVersion']
+            with open(tmpfilename, 'wb') as f:
+                f.write(bytestr(json.dumps(root)))
+            ret, outtxt, errtxt = run_args(['--diff', tmpfilename, filename])
+            self.assertEqual(ret, xcodeprojer.DIFF_DIFFERENCES)
+            self.assertIn('@@ 4CDE96A519B3613C009DF310 /* main.c */ PBXFileReference @@\n'
+                          '-path = renamed.c\n'
+                          '+path = main.c\n', outtxt)
+        finally:
+            os.remove(tmpfilename)
+
+
+class TextDiffTestCase(unittest.TestCase):
+
+    def test_unified_diff(self):
+        prj, filename = read_intl_project()
+        a = xcodeprojer.unilines(prj)
+        b = list(a)
+        b[20] = 'changed\n'
+        del b[40]
+        b.insert(60, 'new\n')
+        self.assertEqual(list(xcodeprojer.unified_diff(a, b, 'a', 'b')), list(difflib.unified_diff(a, b, 'a', 'b')))
+        self.assertEqual(list(xcodeprojer.unified_diff(a, a)), [])
+
+        rnd = random.Random(42)
+        for _ in range(50):
+            b = list(a)
+            for _ in range(rnd.randint(1, 100)):
+                pos = rnd.randrange(len(b))
+                if rnd.random() < 0.5:
+                    del b[pos]
+                else:
+                    b.insert(pos, rnd.choice(a))
+            patched, pos = [], 0
+            for tag, i1, i2, j1, j2 in xcodeprojer.LineMatcher(a, b).get_opcodes():
+                if tag == 'equal':
+                    self.assertEqual(a[i1:i2], b[j1:j2])
+                patched.extend(b[j1:j2])
+            self.assertEqual(patched, b)
+
+    def test_html_diff(self):
+        a = ['first\n', 'a < b\n', 'last\n']
+        b = ['first\n', 'a > b\n', 'last\n']
+        html = xcodeprojer.html_diff(a, b, fromdesc='project.pbxproj')
+        self.assertIn('<td class="diff_header">2</td><td class="diff_chg">a &lt; b</td>', html)
+        self.assertIn('<td class="diff_header">2</td><td class="diff_chg">a &gt; b</td>', html)
+        self.assertIn('<th colspan="2">project.pbxproj</th>', html)
+
+
 class PlutilTestCase(unittest.TestCase):
 
     # Verifying that our XML generator matches plutil(1)
@@ -432,6 +960,25 @@ class CmdlineTestCase(unittest.TestCase):
         self.assertEqual(ret, xcodeprojer.ERROR)
         self.assertEqual(outtxt, '')
 
+    def test_convert_without_objectversion(self):
+        prj, filename = read_mini_project()
+        root, parseinfo = parse(prj)
+        del root['objectVersion']
+        tmpdir = tempfile.mkdtemp()
+        try:
+            jsonfilename = os.path.join(tmpdir, 'project.json')
+            jsontext = bytestr(json.dumps(root))
+            with open(jsonfilename, 'wb') as f:
+                f.write(jsontext)
+            ret, outtxt, errtxt = run_args(['--convert', 'xcode', jsonfilename])
+            self.assertEqual(ret, xcodeprojer.CONVERT_OUTPUT_FAILED)
+            self.assertEqual(read_file(jsonfilename), jsontext)
+            self.assertEqual(os.listdir(tmpdir), ['project.json'])
+            ret, outtxt, errtxt = run_args(['-o', '-', '--convert', 'xcode', jsonfilename])
+            self.assertEqual((ret, outtxt), (xcodeprojer.CONVERT_OUTPUT_FAILED, ''))
+        finally:
+            shutil.rmtree(tmpdir)
+
     def test_lint(self):
         filename = rel(INTL_PROJECT_FILENAME)
         ret, outtxt, errtxt = run_args(['--lint', '-o', '-', filename])
@@ -450,6 +997,28 @@ class CmdlineTestCase(unittest.TestCase):
         expectedend = 'is in XML which is a clearly a failed lint.\n'
         self.assertEqual(outtxt[-len(expectedend):], expectedend)
 
+    def test_lint_integrity(self):
+        prj, filename = read_mini_project()
+        root, parseinfo = parse(prj)
+        del root['objects']['4CDE96A519B3613C009DF310']
+        fd, tmpfilename = tempfile.mkstemp(suffix='.pbxproj')
+        os.close(fd)
+        try:
+            with open(tmpfilename, 'wb') as f:
+                f.write(xcodeprojer.unparse(root, projectname='MiniProject'))
+            ret, outtxt, errtxt = run_args(['--lint', '--projectname', 'MiniProject', tmpfilename])
+            self.assertEqual(ret, xcodeprojer.LINT_FAILED)
+            self.assertEqual(outtxt, 'The project file "%s" is broken at 4CDE96A419B3613C009DF310 children:'
+                                     ' the referenced object 4CDE96A519B3613C009DF310 is missing.\n'
+                                     'The project file "%s" is broken at 4CDE96A619B3613C009DF310 fileRef:'
+                                     ' the referenced object 4CDE96A519B3613C009DF310 is missing.\n'
+                                     % (tmpfilename, tmpfilename))
+            self.assertEqual(run_process(['--lint', '--projectname', 'MiniProject', tmpfilename]),
+                             xcodeprojer.LINT_FAILED)
+            self.assertEqual(run_process(['--lint', rel(MINI_PROJECT_FILENAME)]), xcodeprojer.OK)
+        finally:
+            os.remove(tmpfilename)
+
     def test_gidsplit(self):
         ret, outtxt, errtxt = run_args(['--gidsplit', '4CDE96A219B3613C009DF310'])
         self.assertEqual(ret, 0)
@@ -480,6 +1049,97 @@ class CmdlineTestCase(unittest.TestCase):
         else:
             self.assertFalse("The object %r cound not be found." % gid)
 
+    def test_catalog(self):
+        fd, dbfilename = tempfile.mkstemp(suffix='.db')
+        os.close(fd)
+        try:
+            ret, outtxt, errtxt = run_args(['--catalog', dbfilename, rel('data')])
+            self.assertEqual(ret, xcodeprojer.OK)
+            self.assertEqual(outtxt, '2 projects loaded, 0 unchanged, 0 failed\n')
+            ret, outtxt, errtxt = run_args(['--catalog', dbfilename, rel('data')])
+            self.assertEqual(outtxt, '0 projects loaded, 2 unchanged, 0 failed\n')
+
+            db = sqlite3.connect(dbfilename)
+            try:
+                rows = list(db.execute('SELECT objects.comment, refs.keypath FROM refs JOIN objects'
+                                       ' ON objects.project = refs.project AND objects.gid = refs.source'
+                                       ' WHERE refs.target = ? ORDER BY refs.keypath',
+                                       ['4CDE96A519B3613C009DF310']))
+                self.assertEqual(rows, [('MiniProject', 'children'), ('main.c in Sources', 'fileRef')])
+                rows = list(db.execute('SELECT date, user, pid, seq FROM gids WHERE gid = ?',
+                                       ['4C36A8C719A0D91D00F6C76D']))
+                self.assertEqual(rows, [('2014-08-17T12:35:41Z', 76, 54, 43207)])
+            finally:
+                db.close()
+        finally:
+            os.remove(dbfilename)
+
+    def test_catalog_failures(self):
+        prj, filename = read_mini_project()
+        root, parseinfo = parse(prj)
+        root['objects']['GHIJKLMNOPQRSTUVWXYZ0123'] = {'isa': 'PBXFileReference', 'path': 'odd.c'}
+        tmpdir = tempfile.mkdtemp()
+        try:
+            projectdir = os.path.join(tmpdir, 'Odd.xcodeproj')
+            os.mkdir(projectdir)
+            with open(os.path.join(projectdir, 'project.pbxproj'), 'wb') as f:
+                f.write(xcodeprojer.unparse(root, projectname='Odd'))
+            dbfilename = os.path.join(tmpdir, 'catalog.db')
+            missing = os.path.join(tmpdir, 'Missing.xcodeproj', 'project.pbxproj')
+            ret, outtxt, errtxt = run_args(['--catalog', dbfilename, '--workers', '2', projectdir, missing])
+            self.assertEqual(ret, xcodeprojer.ERROR)
+            self.assertEqual(outtxt, '1 projects loaded, 0 unchanged, 1 failed\n')
+            db = sqlite3.connect(dbfilename)
+            try:
+                rows = list(db.execute('SELECT gid FROM gids WHERE gid = ?', ['GHIJKLMNOPQRSTUVWXYZ0123']))
+                self.assertEqual(rows, [])
+                rows = list(db.execute('SELECT path FROM objects WHERE gid = ?', ['GHIJKLMNOPQRSTUVWXYZ0123']))
+                self.assertEqual(rows, [('odd.c',)])
+            finally:
+                db.close()
+        finally:
+            shutil.rmtree(tmpdir)
+
+    def test_orphans(self):
+        ret, outtxt, errtxt = run_args(['--orphans', rel(MINI_PROJECT_FILENAME)])
+        self.assertEqual(ret, xcodeprojer.OK)
+        self.assertEqual(outtxt, '')
+
+        prj, filename = read_mini_project()
+        root, parseinfo = parse(prj)
+        root['objects']['4CDE96A519B3613C009DF399'] = {'isa': 'PBXFileReference', 'path': 'lost.c'}
+        fd, tmpfilename = tempfile.mkstemp(suffix='.pbxproj')
+        os.close(fd)
+        try:
+            # The unparser only writes dicts as objects, so the odd one is added to the text.
+            text = xcodeprojer.unparse(root, projectname='MiniProject')
+            with open(tmpfilename, 'wb') as f:
+                f.write(text.replace(b'\tobjects = {\n', b'\tobjects = {\n\t\t4CDE96A519B3613C009DF398 = nodict;\n', 1))
+            args = ['--orphans', '--projectname', 'MiniProject', tmpfilename]
+            ret, outtxt, errtxt = run_args(args)
+            self.assertEqual(ret, xcodeprojer.ERROR)
+            self.assertEqual(outtxt, 'The project file "%s" has 2 unreachable objects:\n'
+                                     '    4CDE96A519B3613C009DF398\n'
+                                     '    4CDE96A519B3613C009DF399 /* lost.c */ PBXFileReference\n' % tmpfilename)
+            ret, outtxt, errtxt = run_args(['--orphans', '--remove'] + args[1:])
+            self.assertEqual(ret, xcodeprojer.OK)
+            self.assertEqual(unistr(read_file(tmpfilename)), prj)
+
+            # Without an objectVersion there are no comments and nothing can be written.
+            del root['objectVersion']
+            jsontext = bytestr(json.dumps(root))
+            with open(tmpfilename, 'wb') as f:
+                f.write(jsontext)
+            ret, outtxt, errtxt = run_args(args)
+            self.assertEqual(ret, xcodeprojer.ERROR)
+            self.assertEqual(outtxt, 'The project file "%s" has 1 unreachable objects:\n'
+                                     '    4CDE96A519B3613C009DF399 PBXFileReference\n' % tmpfilename)
+            ret, outtxt, errtxt = run_args(['--orphans', '--remove'] + args[1:])
+            self.assertEqual(ret, xcodeprojer.CONVERT_OUTPUT_FAILED)
+            self.assertEqual(read_file(tmpfilename), jsontext)
+        finally:
+            os.remove(tmpfilename)
+
 # ---------------------------------------------------------------------
 #
 # plutil(1) can be used to verify correct translation for XML and JSON.
@@ -537,6 +1197,92 @@ class GlobalIDTestCase(unittest.TestCase):
             self.assertEqual(gen.generate(), '4CC742AF19880BB200393AF0')
             self.assertEqual(gen.generate(), '4CC742B019880BBC00393AF0')
 
+    def test_generate_batch(self):
+        self.seconds = xcodeprojer.UniqueXcodeIDGenerator.reftime(1406653460)
+        self.seconds_increment = 0
+        generators = [xcodeprojer.UniqueXcodeIDGenerator(username='unrecompiled', pid=56007,
+                                                         refdatefunc=self.timefunc) for _ in range(2)]
+        for gen in generators:
+            # Let the 16 bit sequence number wrap around within the batch.
+            gen.randomseq = 0xfff0
+        single, batched = generators
+        expected = [single.generate() for _ in range(40)]
+        self.assertEqual(batched.generate_batch(40), expected)
+        self.assertEqual(batched.generate_batch(0), [])
+        self.assertEqual(batched.generate(), single.generate())
+
+        gids = list(xcodeprojer.generate_gids(0x10000 + 3, username='bench', pid=1, refdate='2014-09-01T12:00:00Z'))
+        self.assertEqual(len(set(gids)), len(gids))
+        self.assertEqual(gids[0x10000][8:16], '%08X' % (int(gids[0][8:16], 16) + 1))
+
+    def test_gid_allocator(self):
+        prj, filename = read_mini_project()
+        root, parseinfo = parse(prj)
+        params = dict(username='bench', pid=1, refdate='2014-09-01T12:00:00Z')
+        first, second = list(xcodeprojer.generate_gids(2, **params))
+        root['objects'][first] = {'isa': 'PBXGroup', 'children': []}
+
+        allocator = xcodeprojer.GidAllocator([root], **params)
+        self.assertIn(first, allocator)
+        self.assertEqual(allocator.allocate(), second)
+        gids = allocator.allocate_batch(100)
+        self.assertEqual(len(set(gids + [first, second]) - set(root['objects'])), 101)
+
+    def test_content_gids(self):
+        prj, filename = read_mini_project()
+        root, parseinfo = parse(prj)
+        group = '4CDE96A419B3613C009DF310'
+        identities = [('PBXFileReference', 'file%d.c' % i, group) for i in range(3)]
+        gids = xcodeprojer.GidAllocator([root]).allocate_for_batch(identities)
+        self.assertEqual(gids, [xcodeprojer.content_gid(identity) for identity in identities])
+        self.assertTrue(all(xcodeprojer.is_global_id(gid) for gid in gids))
+
+        # The second allocation of an identity collides with the first.
+        allocator = xcodeprojer.GidAllocator([root])
+        again = [allocator.allocate_for(identities[0]) for _ in range(3)]
+        self.assertEqual(again[0], gids[0])
+        self.assertEqual(len(set(again)), 3)
+        self.assertEqual(again, xcodeprojer.GidAllocator([root]).allocate_for_batch([identities[0]] * 3))
+
+    @unittest.skipIf(xcodeprojer.fcntl is None, 'no file locking')
+    def test_gid_reservation(self):
+        params = dict(username='bench', pid=1, refdate='2014-09-01T12:00:00Z')
+        fd, reservation_file = tempfile.mkstemp()
+        os.close(fd)
+        try:
+            a = xcodeprojer.GidAllocator(reservation_file=reservation_file, **params)
+            b = xcodeprojer.GidAllocator(reservation_file=reservation_file, **params)
+            gids = a.allocate_batch(3) + b.allocate_batch(3) + [a.allocate(), b.allocate()]
+            self.assertEqual(len(set(gids)), 8)
+            with open(reservation_file) as f:
+                self.assertEqual(f.read().split(), gids)
+        finally:
+            os.remove(reservation_file)
+
+    def test_decode_gids(self):
+        gids = ['4CC7BE4419880B9E009C9D7C', '4CC7BE4719880BBC009C9D7C', 'FF00FFFFFFFFFFFFFFFFFFFF']
+        columns = xcodeprojer.decode_gids(gids)
+        number = xcodeprojer.UniqueXcodeIDGenerator.big_endian_number
+        self.assertEqual(columns.gids, tuple(gids))
+        self.assertEqual(columns.users, tuple(number(g[:2]) for g in gids))
+        self.assertEqual(columns.pids, tuple(number(g[2:4]) for g in gids))
+        self.assertEqual(columns.seqs, tuple(number(g[4:8]) for g in gids))
+        self.assertEqual(columns.dates, tuple(number(g[8:16]) for g in gids))
+        self.assertEqual(columns.randoms, tuple(number(g[16:24]) for g in gids))
+        self.assertEqual(xcodeprojer.format_gid_dates(columns.dates[:2]),
+                         ['2014-07-29T17:04:30Z', '2014-07-29T17:05:00Z'])
+        self.assertEqual(xcodeprojer.decode_gids([]).users, ())
+
+    def test_gid_comments(self):
+        for prj, filename in [read_mini_project(), read_intl_project()]:
+            root, parseinfo = parse(prj)
+            prjname = xcodeprojer.projectname_for_path(filename)
+            unparser = xcodeprojer.Unparser(root)
+            unparser.unparse(root, projectname=prjname)
+            self.assertEqual(xcodeprojer.gid_comments(root, projectname=prjname), unparser.gidcomments)
+        self.assertEqual(xcodeprojer.gid_comments(root, projectname=prjname)['4C36A8C719A0D91D00F6C76D'],
+                         'Build configuration list for PBXProject "%s"' % prjname)
+
     def test_gidsplit(self):
         buf = StringIO()
         xcodeprojer.gidsplit(['4CC7BE4419880B9E009C9D7C', '4CC7BE4719880BBC009C9D7C'], buf=buf)
@@ -571,6 +1317,19 @@ class GlobalIDTestCase(unittest.TestCase):
 """
         self.assertEqual(text, expected)
 
+        buf = StringIO()
+        xcodeprojer.gidsplit(iter(['4CC7BE4719880BBC009C9D7C', 'nogid', '4CC7BE4419880B9E009C9D7C']),
+                             format='json', sort=True, buf=buf, chunksize=1)
+        self.assertEqual(buf.getvalue(), expected)
+
+    def test_external_sort(self):
+        rnd = random.Random(0)
+        lines = ['%08X' % rnd.randint(0, 0xfffff) for _ in range(1000)]
+        self.assertEqual(list(xcodeprojer.external_sort(lines, chunksize=64)), sorted(lines))
+        self.assertEqual(list(xcodeprojer.external_sort(lines, chunksize=1000)), sorted(lines))
+        self.assertEqual(list(xcodeprojer.external_sort(lines, chunksize=5000)), sorted(lines))
+        self.assertEqual(list(xcodeprojer.external_sort([], chunksize=64)), [])
+
 # ---------------------------------------------------------------
 
 if __name__ == '__main__':
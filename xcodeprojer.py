@@ -40,20 +40,40 @@ import datetime
 import difflib
 import tempfile
 import codecs
-from operator import xor
+import shutil
+import multiprocessing
+import binascii
+import struct
+import hashlib
+import sqlite3
+from operator import xor, itemgetter
 from io import BytesIO
+from itertools import islice, chain, groupby
+import heapq
+import posixpath
+from bisect import bisect_left
+from xml.sax.saxutils import escape as escape_html
+from contextlib import contextmanager
 
-from collections import OrderedDict
+from collections import OrderedDict, defaultdict, namedtuple
 
 try:
     import xml.etree.cElementTree as ETree
 except ImportError:
     import xml.etree.ElementTree as ETree
 
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
 
-__all__ = ['parse', 'unparse', 'report_parse_status', 'projectname_for_path',
-           'print_diff', 'is_global_id', 'find_projectfiles',
-           'UniqueXcodeIDGenerator', 'gidfields']
+
+__all__ = ['parse', 'unparse', 'unparse_to', 'TrackedDict', 'track_changes', 'is_modified', 'report_parse_status', 'projectname_for_path',
+           'print_diff', 'is_global_id', 'is_hex_global_id', 'find_projectfiles',
+           'UniqueXcodeIDGenerator', 'GidAllocator', 'content_gid', 'gidfields', 'decode_gids', 'gid_comments',
+           'catalog_projects', 'ReferenceIndex', 'BuildSettingsIndex', 'PathIndex', 'reference_index', 'Project', 'ProjectBatch',
+           'find_orphans', 'remove_orphans', 'check_integrity', 'merge', 'merge_roots',
+           'diff_roots', 'print_structural_diff']
 
 PBXPROJNAME = 'project.pbxproj'
 
@@ -66,6 +86,10 @@ LINT_FAILED = 2
 
 CONVERT_OUTPUT_FAILED = 2
 
+MERGE_CONFLICTS = 1
+
+DIFF_DIFFERENCES = 1
+
 
 LATEST_OBJECT_VERSION = 46
 
@@ -89,6 +113,12 @@ else:
     unichr = chr
 
 
+if hasattr(os, 'replace'):
+    replace_file = os.replace
+else:
+    replace_file = os.rename
+
+
 def unistr(text):
     if not isinstance(text, text_type):
         text = text.decode('utf-8')
@@ -134,6 +164,7 @@ escape_dict = {v: k for k, v in unescape_dict.items()}
 # some characters even when they are accepted in unquoted strings.
 r_quoteworthy = re.compile(r'[^a-zA-Z0-9$./_]|___')
 r_gid = re.compile(r'\A[0-9A-Z]{24}\Z')
+r_hexgid = re.compile(r'\A[0-9A-F]{24}\Z')
 r_ws = re.compile(r'\s*')
 
 # Here we have the tokenizing expression that splits any Xcode plist
@@ -184,14 +215,20 @@ def parse(text, format=None, dictionarytype=dict, parsertype='normal'):
     :param text: the content of a project.pbxproj.
     :param format: one of 'xcode', 'xml', 'json' or None for automatic detection.
     :param dictionarytype: should be dict or OrderedDict.
+                           With TrackedDict the tree records its modifications.
     :param parsertype: normal: parse plists via syntax transformation by the fast JSON parser
                                and use the classic parser if the JSON parser failed.
                        fast: only parse with the fast JSON parser.
                        classic: only parse plists with the classic parser.
     :return: the tuple (rootnode, parseinfo).
     """
-    text = unistr(text)
+    root, parseinfo = parse_text(unistr(text), format, dictionarytype, parsertype)
+    if isinstance(root, TrackedDict):
+        root = track_changes(root, source=text)
+    return root, parseinfo
 
+
+def parse_text(text, format, dictionarytype, parsertype):
     root, parseinfo = None, None
     can_only_be_xml = text.startswith('<?xml')
     if format == 'xml' or (format is None and can_only_be_xml):
@@ -214,7 +251,7 @@ def parse_xcodeproject_plist(text, dictionarytype=dict, parsertype='normal'):
 
     if parsertype in ['normal', 'fast']:
         # Try the JSON based plist parser first
-        root, parseinfo = parse_xcodeproject_plist_via_json(text)
+        root, parseinfo = parse_xcodeproject_plist_via_json(text, dictionarytype=dictionarytype)
         if root is not None or parsertype == 'fast':
             return root, parseinfo
 
@@ -351,6 +388,11 @@ def is_global_id(node):
     return r_gid.match(node) is not None
 
 
+def is_hex_global_id(node):
+    """Only gids made of hex digits can be taken apart by decode_gids()."""
+    return r_hexgid.match(node) is not None
+
+
 def escape_str(text):
     def replace(m):
         char = m.group(0)
@@ -797,36 +839,1424 @@ def parse_xcodeproject_xml(text, dictionarytype=dict):
 
 
 # ---------------------------------------------------------------
+# Change tracking
+#
+# A tree of TrackedDict and TrackedList nodes reports every modification
+# to its ChangeTracker. Each node knows the gid of the object in the
+# 'objects' dict it belongs to, its owner, so the tracker can tell
+# which objects changed.
+
+OBJECTS_OWNER = '<objects>'
+
+
+class ChangeTracker(object):
+    """Counts the modifications of a tracked tree.
+    Every modification increments version and stamps its owner
+    with the new version. The owner is the gid of the changed object,
+    None for changes outside of the 'objects' dict and OBJECTS_OWNER
+    when the 'objects' dict itself was replaced.
+    """
+
+    def __init__(self, root, source=None):
+        self.root = root
+        self.source = source
+        self.version = 0
+        self.stamps = {}
+        self.canonical_key = None
+        # Indexes over the tree that live as long as the tree
+        # and update themselves from the stamps.
+        self.indexes = {}
+
+    @property
+    def modified(self):
+        return self.version > 0
+
+    def touch(self, owner):
+        self.version += 1
+        self.stamps[owner] = self.version
+
+    def changed_since(self, version):
+        """Return the set of owners that were modified after version."""
+        return set(owner for owner, stamp in self.stamps.items() if stamp > version)
+
+    def source_output(self, key):
+        """Return the original bytes if they are what an unparse
+        with the parameters in key would produce.
+        """
+        if not self.modified and key == self.canonical_key:
+            return self.source
+        return None
+
+    def register_output(self, key, output):
+        """Remember if the unmodified tree reproduces its original
+        bytes so the next unparse can skip all the work.
+        """
+        if not self.modified and self.source is not None and output == self.source:
+            self.canonical_key = key
+            return self.source
+        return output
+
+
+class TrackedDict(dict):
+    """A dict that reports its modifications to the ChangeTracker of its tree.
+    Pass it as dictionarytype to parse() to get a tracked tree.
+    Values stored into a tracked tree are converted into tracked
+    containers, so modify them through the tree afterwards.
+    """
+
+    __slots__ = ('tracker', 'owner')
+
+    def __init__(self, *args, **kwargs):
+        super(TrackedDict, self).__init__(*args, **kwargs)
+        self.tracker = None
+        self.owner = None
+
+    def owner_for(self, key):
+        if self.owner is OBJECTS_OWNER:
+            return key
+        if key == 'objects' and self.tracker is not None and self is self.tracker.root:
+            return OBJECTS_OWNER
+        return self.owner
+
+    def changed(self, key):
+        if self.tracker is not None:
+            self.tracker.touch(self.owner_for(key))
+
+    def __setitem__(self, key, value):
+        if self.tracker is not None:
+            value = track_node(value, self.tracker, self.owner_for(key))
+        dict.__setitem__(self, key, value)
+        self.changed(key)
+
+    def __delitem__(self, key):
+        dict.__delitem__(self, key)
+        self.changed(key)
+
+    def setdefault(self, key, default=None):
+        if key not in self:
+            self[key] = default
+        return self[key]
+
+    def pop(self, key, *default):
+        if key in self:
+            value = dict.pop(self, key)
+            self.changed(key)
+            return value
+        return dict.pop(self, key, *default)
+
+    def popitem(self):
+        key, value = dict.popitem(self)
+        self.changed(key)
+        return key, value
+
+    def clear(self):
+        keys = list(self)
+        dict.clear(self)
+        for key in keys:
+            self.changed(key)
+
+    def update(self, *args, **kwargs):
+        for key, value in dict(*args, **kwargs).items():
+            self[key] = value
+
+    def __ior__(self, other):
+        self.update(other)
+        return self
+
+    def __reduce__(self):
+        # Copies and pickles are plain dicts without a tracker.
+        return dict, (dict(self),)
+
+
+class TrackedList(list):
+    """The list counterpart of TrackedDict."""
+
+    __slots__ = ('tracker', 'owner')
+
+    def __init__(self, *args):
+        super(TrackedList, self).__init__(*args)
+        self.tracker = None
+        self.owner = None
+
+    def changed(self):
+        if self.tracker is not None:
+            self.tracker.touch(self.owner)
+
+    def tracked(self, value):
+        if self.tracker is None:
+            return value
+        return track_node(value, self.tracker, self.owner)
+
+    def __setitem__(self, index, value):
+        if isinstance(index, slice):
+            value = [self.tracked(v) for v in value]
+        else:
+            value = self.tracked(value)
+        list.__setitem__(self, index, value)
+        self.changed()
+
+    def __delitem__(self, index):
+        list.__delitem__(self, index)
+        self.changed()
+
+    if PY2:
+        def __setslice__(self, i, j, values):
+            self.__setitem__(slice(i, j), values)
+
+        def __delslice__(self, i, j):
+            self.__delitem__(slice(i, j))
+
+    def append(self, value):
+        list.append(self, self.tracked(value))
+        self.changed()
+
+    def extend(self, values):
+        list.extend(self, [self.tracked(v) for v in values])
+        self.changed()
+
+    def insert(self, index, value):
+        list.insert(self, index, self.tracked(value))
+        self.changed()
+
+    def pop(self, *args):
+        value = list.pop(self, *args)
+        self.changed()
+        return value
+
+    def remove(self, value):
+        list.remove(self, value)
+        self.changed()
+
+    def reverse(self):
+        list.reverse(self)
+        self.changed()
+
+    def sort(self, *args, **kwargs):
+        list.sort(self, *args, **kwargs)
+        self.changed()
+
+    def __iadd__(self, values):
+        self.extend(values)
+        return self
+
+    def __imul__(self, n):
+        list.__imul__(self, n)
+        self.changed()
+        return self
+
+    def __reduce__(self):
+        return list, (list(self),)
+
+
+def track_node(node, tracker, owner):
+    """Return node as a tracked container bound to tracker and owner.
+    Unbound TrackedDicts, e.g. fresh from the parser, are bound in place,
+    other containers are copied.
+    """
+    if isinstance(node, dict):
+        if isinstance(node, TrackedDict):
+            if node.tracker is tracker and node.owner == owner:
+                return node
+            if node.tracker is not None:
+                node = dict(node)
+        if not isinstance(node, TrackedDict):
+            node = TrackedDict(node)
+        node.tracker = tracker
+        node.owner = owner
+        for k, v in node.items():
+            if isinstance(v, (dict, list, tuple)):
+                dict.__setitem__(node, k, track_node(v, tracker, node.owner_for(k)))
+        return node
+    elif isinstance(node, (list, tuple)):
+        if isinstance(node, TrackedList) and node.tracker is tracker and node.owner == owner:
+            return node
+        tracked = TrackedList(track_node(v, tracker, owner) for v in node)
+        tracked.tracker = tracker
+        tracked.owner = owner
+        return tracked
+    return node
+
+
+def track_changes(root, source=None):
+    """Return root as a tracked tree with a new ChangeTracker.
+
+    :param root: a parsed tree, it is converted in place when it consists of TrackedDicts.
+    :param source: the text root was parsed from. If an unparse of the
+                   unmodified tree reproduces it, further unparses return it right away.
+    """
+    tracker = ChangeTracker(None, source=bytestr(source) if source is not None else None)
+    if not isinstance(root, TrackedDict) or root.tracker is not None:
+        root = TrackedDict(root)
+    tracker.root = root
+    return track_node(root, tracker, None)
+
+
+def is_modified(root):
+    """Return False only for a tracked tree that was not modified
+    since it was parsed, in which case there is nothing to write.
+    """
+    tracker = getattr(root, 'tracker', None)
+    if tracker is None:
+        return True
+    return tracker.modified
+
+
+class CommentTables(object):
+    """The lookup tables the Unparser needs to create the comments.
+
+    For a tracked tree the tables stay with the tracker. On the next
+    unparse only the entries of the objects that changed in the meantime
+    are replaced. The cached comments remember which objects they were
+    computed from and are dropped when one of those objects changes.
+    """
+
+    def __init__(self, incremental=False):
+        self.incremental = incremental
+        self.section_for_file = {}
+        self.build_configuration_lists = {}
+        self.gidcomments = {}
+
+        # Only needed for incremental updates.
+        self.contributions = {}
+        self.file_phases = defaultdict(set)
+        self.bcl_owners = defaultdict(set)
+        self.dependents = defaultdict(set)
+        self.version = None
+        self.settings = None
+
+    def rebuild(self, unparser):
+        self.section_for_file.clear()
+        self.build_configuration_lists.clear()
+        self.gidcomments.clear()
+        self.contributions.clear()
+        self.file_phases.clear()
+        self.bcl_owners.clear()
+        self.dependents.clear()
+
+        if not self.incremental:
+            for obj in unparser.objects.values():
+                files, name, bcl = self.contribution(unparser, obj)
+                for f in files:
+                    self.section_for_file[f] = name
+                if bcl is not None:
+                    self.build_configuration_lists[bcl] = obj
+            return
+
+        for gid, obj in unparser.objects.items():
+            self.add_contribution(unparser, gid, obj)
+        self.resolve(unparser, self.file_phases, self.bcl_owners)
+
+    def update(self, unparser, tracker):
+        settings = (unparser.version, unparser.projectname,
+                    bool(unparser.disable_comments or not unparser.has_comments()))
+        changed = None
+        if self.version is not None and settings == self.settings:
+            changed = tracker.changed_since(self.version)
+        self.version = tracker.version
+        self.settings = settings
+
+        if changed is None or OBJECTS_OWNER in changed:
+            self.rebuild(unparser)
+            return
+
+        # Changes outside of the 'objects' dict don't influence the comments.
+        changed.discard(None)
+        files, bcls = set(), set()
+        for gid in changed:
+            oldfiles, oldname, oldbcl = self.contributions.pop(gid, ((), None, None))
+            for f in oldfiles:
+                self.file_phases[f].discard(gid)
+                files.add(f)
+            if oldbcl is not None:
+                self.bcl_owners[oldbcl].discard(gid)
+                bcls.add(oldbcl)
+            obj = unparser.objects.get(gid)
+            if obj is not None:
+                newfiles, newname, newbcl = self.add_contribution(unparser, gid, obj)
+                files.update(newfiles)
+                if newbcl is not None:
+                    bcls.add(newbcl)
+
+        self.resolve(unparser,
+                     dict((f, self.file_phases[f]) for f in files),
+                     dict((bcl, self.bcl_owners[bcl]) for bcl in bcls))
+
+        for gid in changed | files | bcls:
+            self.gidcomments.pop(gid, None)
+            for dependent in self.dependents.pop(gid, ()):
+                self.gidcomments.pop(dependent, None)
+
+    @staticmethod
+    def contribution(unparser, obj):
+        """Return the files obj lists with the name of their section
+        and the configuration list obj refers to.
+        """
+        files = unparser.getmember(obj, 'files')
+        name = None
+        if isinstance(files, list):
+            name = unparser.get_name(obj)
+            if name is None:
+                name = unparser.buildphasename(unparser.getmember(obj, 'isa'))
+        else:
+            files = ()
+        return files, name, unparser.getmember(obj, 'buildConfigurationList')
+
+    def add_contribution(self, unparser, gid, obj):
+        files, name, bcl = self.contribution(unparser, obj)
+        files = tuple(files)
+        self.contributions[gid] = files, name, bcl
+        for f in files:
+            self.file_phases[f].add(gid)
+        if bcl is not None:
+            self.bcl_owners[bcl].add(gid)
+        return files, name, bcl
+
+    def resolve(self, unparser, file_phases, bcl_owners):
+        """Set the table entries from the objects that contribute them.
+        A full scan lets the last object in the 'objects' dict win
+        when several contribute the same entry, so do we.
+        """
+        positions = []
+
+        def last(gids):
+            if len(gids) == 1:
+                return next(iter(gids))
+            if not positions:
+                positions.append(dict((gid, i) for i, gid in enumerate(unparser.objects)))
+            return max(gids, key=positions[0].get)
+
+        for f, phases in file_phases.items():
+            if phases:
+                self.section_for_file[f] = self.contributions[last(phases)][1]
+            else:
+                self.section_for_file.pop(f, None)
+        for bcl, owners in bcl_owners.items():
+            if owners:
+                self.build_configuration_lists[bcl] = unparser.objects[last(owners)]
+            else:
+                self.build_configuration_lists.pop(bcl, None)
+
+    def record_dependencies(self, gid, gids):
+        for dependency in gids:
+            self.dependents[dependency].add(gid)
+
+
+class FragmentCache(object):
+    """The text of every object in the 'objects' dict of a tracked tree
+    together with the stamp of the object and the comments in the text.
+    A fragment can be reused as long as the object has the same stamp
+    and the comments it contains are still the same.
+    """
+
+    def __init__(self):
+        self.fragments = {}
+        self.stamps = {}
+        self.version = None
+        self.settings = None
+
+    def prepare(self, unparser, tracker):
+        settings = (unparser.version, unparser.projectname, bool(unparser.disable_comments))
+        if (self.version is None or settings != self.settings
+                or tracker.stamps.get(OBJECTS_OWNER, 0) > self.version):
+            self.fragments.clear()
+        else:
+            # Forget the fragments of removed objects.
+            for gid in tracker.changed_since(self.version):
+                if gid not in unparser.objects:
+                    self.fragments.pop(gid, None)
+        self.stamps = tracker.stamps
+        self.version = tracker.version
+        self.settings = settings
+
+    def stamp(self, gid):
+        return self.stamps.get(gid, 0)
+
+
+def object_references(obj, keypath=()):
+    """Yield (keypath, target) for every value in obj that looks like a gid.
+    The keypath joins the keys inside of obj with dots.
+    """
+    if isinstance(obj, dict):
+        for k, v in obj.items():
+            for ref in object_references(v, keypath + (k,)):
+                yield ref
+    elif isinstance(obj, (list, tuple)):
+        for v in obj:
+            for ref in object_references(v, keypath):
+                yield ref
+    elif is_global_id(obj):
+        yield '.'.join(keypath), obj
+
+
+def iter_references(objects):
+    """Yield (source, keypath, target) for every reference between the objects."""
+    for gid, obj in objects.items():
+        for keypath, target in object_references(obj):
+            yield gid, keypath, target
+
+
+class ObjectIndex(object):
+    """Base class of the indexes over the objects of a project that
+    are built in one pass and can be updated object by object.
+
+    Subclasses override three methods, whose defaults do nothing:
+    clear() resets the index to empty, add_object(gid, obj) enters an
+    object and remove_object(gid) takes out everything add_object()
+    entered for gid. remove_object() is also called for gids that were
+    never added and must ignore them. rebuild() and update_object() are
+    built from these.
+
+    After modifying the objects of an untracked tree call update_object()
+    for the changed gids. The Project keeps the indexes of a tracked tree
+    with the tracker and updates them from the modifications.
+    """
+
+    def __init__(self, objects=None):
+        self.version = None
+        self.clear()
+        if objects is not None:
+            self.rebuild(objects)
+
+    def clear(self):
+        pass
+
+    def add_object(self, gid, obj):
+        pass
+
+    def remove_object(self, gid):
+        pass
+
+    def rebuild(self, objects):
+        self.clear()
+        for gid, obj in objects.items():
+            self.add_object(gid, obj)
+
+    def update(self, objects, tracker):
+        if self.version == tracker.version:
+            # Nothing was modified, which saves the scan of all stamps.
+            return
+        changed = None
+        if self.version is not None:
+            changed = tracker.changed_since(self.version)
+        self.version = tracker.version
+
+        if changed is None or OBJECTS_OWNER in changed:
+            self.rebuild(objects)
+            return
+        changed.discard(None)
+        for gid in changed:
+            self.update_object(gid, objects.get(gid))
+
+    def update_object(self, gid, obj):
+        """Replace the entries of gid by the ones for obj, None removes them."""
+        self.remove_object(gid)
+        if obj is not None:
+            self.add_object(gid, obj)
+
+
+class ReferenceIndex(ObjectIndex):
+    """For every gid the objects that refer to it."""
+
+    def clear(self):
+        self.referrers_of = defaultdict(set)
+        self.references_of = {}
+
+    def add_object(self, gid, obj):
+        references = tuple(object_references(obj))
+        self.references_of[gid] = references
+        for keypath, target in references:
+            self.referrers_of[target].add((gid, keypath))
+
+    def remove_object(self, gid):
+        for keypath, target in self.references_of.pop(gid, ()):
+            referrers = self.referrers_of.get(target)
+            if referrers is not None:
+                referrers.discard((gid, keypath))
+                if not referrers:
+                    del self.referrers_of[target]
+
+    def referrers(self, gid):
+        """Return the sorted list of (source, keypath) of the references to gid."""
+        return sorted(self.referrers_of.get(gid, ()))
+
+    def references(self, gid):
+        """Return the list of (keypath, target) of the references in the object gid."""
+        return list(self.references_of.get(gid, ()))
+
+
+class AttributeIndex(ObjectIndex):
+    """The gids of the objects by the string value of one of their attributes.
+    The sorted gids of a value are memoized until an object with that value
+    is added or removed.
+    """
+
+    def __init__(self, name, objects=None):
+        self.name = name
+        ObjectIndex.__init__(self, objects)
+
+    def clear(self):
+        self.gids_by_value = defaultdict(set)
+        self.value_of = {}
+        self.sorted_gids = {}
+
+    def add_object(self, gid, obj):
+        value = obj.get(self.name) if isinstance(obj, dict) else None
+        if isinstance(value, (text_type, binary_type)):
+            self.value_of[gid] = value
+            self.gids_by_value[value].add(gid)
+            self.sorted_gids.pop(value, None)
+
+    def remove_object(self, gid):
+        value = self.value_of.pop(gid, None)
+        if value is not None:
+            gids = self.gids_by_value[value]
+            gids.discard(gid)
+            if not gids:
+                del self.gids_by_value[value]
+            self.sorted_gids.pop(value, None)
+
+    def lookup(self, value):
+        """Return the sorted gids as a tuple that is shared by all lookups."""
+        gids = self.sorted_gids.get(value)
+        if gids is None:
+            if value not in self.gids_by_value:
+                return ()
+            gids = self.sorted_gids[value] = tuple(sorted(self.gids_by_value[value]))
+        return gids
+
+
+class BuildSettingsIndex(ObjectIndex):
+    """The chains from the targets and the project over their configuration
+    lists to the build configurations, with the merged build settings
+    memoized per (target, configuration).
+
+    The settings are merged level by level, from the xcconfig file of the
+    project configuration, the project configuration, the xcconfig file of
+    the target configuration to the target configuration.
+    Variables like $(inherited) are not expanded.
+    """
+
+    def clear(self):
+        self.configurationlist_of = {}
+        self.configurations_of = {}
+        self.configuration_of = {}
+        self.merged = {}
+
+    def add_object(self, gid, obj):
+        if not isinstance(obj, dict):
+            return
+        isa = obj.get('isa')
+        if isa == 'XCConfigurationList':
+            self.configurations_of[gid] = list(obj.get('buildConfigurations') or ())
+        elif isa == 'XCBuildConfiguration':
+            self.configuration_of[gid] = obj
+        elif 'buildConfigurationList' in obj:
+            self.configurationlist_of[gid] = obj['buildConfigurationList']
+        else:
+            return
+        self.merged.clear()
+
+    def remove_object(self, gid):
+        found = False
+        for table in (self.configurationlist_of, self.configurations_of, self.configuration_of):
+            if table.pop(gid, None) is not None:
+                found = True
+        if found:
+            self.merged.clear()
+
+    def configurations(self, gid):
+        """Return the build configurations of the target or project gid."""
+        configurations = []
+        for configgid in self.configurations_of.get(self.configurationlist_of.get(gid), ()):
+            configuration = self.configuration_of.get(configgid)
+            if configuration is not None:
+                configurations.append(configuration)
+        return configurations
+
+    def configuration_names(self, gid):
+        return [c.get('name') for c in self.configurations(gid)]
+
+    def settings(self, rootobject, target, configuration, xcconfig=None):
+        """Return the merged build settings of the named configuration of target,
+        which the caller must not modify. For a target of None or the
+        rootObject only the settings of the project are merged.
+
+        xcconfig is called with the gid of a baseConfigurationReference
+        and returns the settings of that file, without it these are skipped.
+        """
+        key = (rootobject, target, configuration, xcconfig)
+        merged = self.merged.get(key)
+        if merged is not None:
+            return merged
+
+        merged = {}
+        owners = [rootobject]
+        if target is not None and target != rootobject:
+            owners.append(target)
+        for owner in owners:
+            for c in self.configurations(owner):
+                if c.get('name') != configuration:
+                    continue
+                baseconfiguration = c.get('baseConfigurationReference')
+                if baseconfiguration is not None and xcconfig is not None:
+                    merged.update(xcconfig(baseconfiguration))
+                merged.update(c.get('buildSettings') or {})
+                break
+        self.merged[key] = merged
+        return merged
+
+
+class PathIndex(ObjectIndex):
+    """The parents of every object in the group tree and the memoized paths
+    of the groups, so the path of a file costs no more than a lookup of
+    its parent once the groups above it were resolved.
+
+    All groups that list a child are kept, so the parent does not depend
+    on the order in which the groups were added or removed.  Should a child
+    be listed by several groups the smallest gid wins.
+
+    Paths in the group tree and relative to SOURCE_ROOT are relative to
+    the directory of the .xcodeproj, other source trees are kept as a
+    variable like $(BUILT_PRODUCTS_DIR) in front of the path.
+    """
+
+    def clear(self):
+        self.parents_of = {}
+        self.children_of = {}
+        self.location_of = {}
+        self.projectdirs = {}
+        self.grouppaths = {}
+
+    def add_object(self, gid, obj):
+        if not isinstance(obj, dict):
+            return
+        if 'sourceTree' in obj:
+            self.location_of[gid] = (obj['sourceTree'], obj.get('path') or '')
+        children = obj.get('children')
+        if isinstance(children, list):
+            self.children_of[gid] = children = list(children)
+            for child in children:
+                self.parents_of.setdefault(child, set()).add(gid)
+            self.grouppaths.clear()
+        if obj.get('isa') == 'PBXProject':
+            self.projectdirs[gid] = obj.get('projectDirPath') or ''
+            self.grouppaths.clear()
+
+    def remove_object(self, gid):
+        self.location_of.pop(gid, None)
+        children = self.children_of.pop(gid, None)
+        if children is not None:
+            for child in children:
+                parents = self.parents_of.get(child)
+                if parents is not None:
+                    parents.discard(gid)
+                    if not parents:
+                        del self.parents_of[child]
+            self.grouppaths.clear()
+        if self.projectdirs.pop(gid, None) is not None:
+            self.grouppaths.clear()
+
+    def sourceroot(self):
+        for projectdir in self.projectdirs.values():
+            return projectdir
+        return ''
+
+    def parent(self, gid):
+        parents = self.parents_of.get(gid)
+        if not parents:
+            return None
+        return min(parents)
+
+    def path(self, gid):
+        """Return the resolved path of gid, None if it has no sourceTree."""
+        if gid not in self.location_of:
+            return None
+
+        # Go up to the first group with a known path, or a source tree
+        # that does not depend on the parent, without recursion.
+        chain = []
+        seen = set()
+        node = gid
+        while node is not None and node not in self.grouppaths and node not in seen:
+            seen.add(node)
+            chain.append(node)
+            tree, _ = self.location_of.get(node, ('<group>', ''))
+            if tree != '<group>':
+                break
+            node = self.parent(node)
+        path = self.grouppaths.get(node, self.sourceroot())
+
+        for node in reversed(chain):
+            tree, nodepath = self.location_of.get(node, ('<group>', ''))
+            if tree == '<group>':
+                path = posixpath.join(path, nodepath)
+            elif tree == '<absolute>':
+                path = nodepath
+            elif tree == 'SOURCE_ROOT':
+                path = posixpath.join(self.sourceroot(), nodepath)
+            else:
+                path = posixpath.join('$(%s)' % tree, nodepath)
+            if path:
+                path = posixpath.normpath(path)
+            if node in self.children_of:
+                self.grouppaths[node] = path
+        return path
+
+
+class Project(object):
+    """A parsed project with indexes for the queries over its objects.
+
+    Every index is built on its first use. The indexes of a tracked tree
+    stay with the tracker and follow all modifications. For other trees
+    call invalidate() after modifying the objects.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self.indexes = {}
+
+    @property
+    def objects(self):
+        return self.root['objects']
+
+    def index(self, key, factory):
+        """Return the up to date index stored under key, factory creates it."""
+        objects = self.objects
+        tracker = getattr(objects, 'tracker', None)
+        indexes = self.indexes if tracker is None else tracker.indexes
+        index = indexes.get(key)
+        if index is None:
+            index = indexes[key] = factory()
+            if tracker is None:
+                index.rebuild(objects)
+        if tracker is not None:
+            index.update(objects, tracker)
+        return index
+
+    def invalidate(self, gid=None):
+        """Update the indexes of an untracked tree for the modified object gid,
+        without gid they are built again when they are used the next time.
+        """
+        if gid is None:
+            self.indexes.clear()
+            return
+        obj = self.objects.get(gid)
+        for index in self.indexes.values():
+            index.update_object(gid, obj)
+
+    def attribute_index(self, name):
+        return self.index('attribute:' + name, lambda: AttributeIndex(name))
+
+    def by_isa(self, isa):
+        """Return the sorted gids of the objects with the given isa as a tuple."""
+        return self.attribute_index('isa').lookup(isa)
+
+    def by_path(self, path):
+        return self.attribute_index('path').lookup(path)
+
+    def by_name(self, name):
+        return self.attribute_index('name').lookup(name)
+
+    def referrers(self, gid):
+        """Return the sorted (gid, keypath) of the objects that refer to gid."""
+        return self.index('references', ReferenceIndex).referrers(gid)
+
+    def orphans(self):
+        return find_orphans(self.root)
+
+    def build_settings(self, target, configuration, xcconfig=None):
+        """Return the effective build settings of the named configuration of
+        the target gid, None for the project, see BuildSettingsIndex.settings.
+        """
+        index = self.index('buildsettings', BuildSettingsIndex)
+        return index.settings(self.root['rootObject'], target, configuration, xcconfig)
+
+    def full_path(self, gid):
+        """Return the path of the file or group gid through the groups above it,
+        see PathIndex, None if gid has no sourceTree.
+        """
+        return self.index('paths', PathIndex).path(gid)
+
+    def full_paths(self, isa='PBXFileReference'):
+        """Return a dict with the full paths of all objects with the given isa."""
+        index = self.index('paths', PathIndex)
+        return dict((gid, index.path(gid)) for gid in self.by_isa(isa))
+
+    @contextmanager
+    def batch(self, allocator=None):
+        """Collect modifications in a ProjectBatch that are applied when
+        the with block ends, nothing is applied when it raises:
+
+            with project.batch() as batch:
+                batch.add_file('main.c', group, buildphase=sources)
+        """
+        batch = ProjectBatch(self, allocator)
+        yield batch
+        batch.commit()
+
+    def configuration_names(self, target=None):
+        """Return the names of the build configurations of the target gid, None for the project."""
+        index = self.index('buildsettings', BuildSettingsIndex)
+        return index.configuration_names(self.root['rootObject'] if target is None else target)
+
+
+class ProjectBatch(object):
+    """Additions and removals of objects and list elements of a Project
+    that are applied together by commit().
+
+    Every list that is modified gets a set of its members on first use,
+    so the duplicate checks take constant time and each list is written
+    only once. The objects and the indexes don't see the modifications
+    before the commit.
+    """
+
+    def __init__(self, project, allocator=None):
+        self.project = project
+        self.allocator = allocator
+        self.added = OrderedDict()
+        self.removed = set()
+        # (gid, key) -> (original members, current members, appended values)
+        self.lists = OrderedDict()
+
+    def new_gid(self):
+        if self.allocator is None:
+            self.allocator = GidAllocator([self.project.root])
+        return self.allocator.allocate()
+
+    def add_object(self, obj, gid=None):
+        """Add obj under gid or a newly allocated gid, which is returned."""
+        if gid is None:
+            gid = self.new_gid()
+        self.added[gid] = obj
+        self.removed.discard(gid)
+        return gid
+
+    def remove_object(self, gid):
+        """Remove the object and its gid from the lists of the objects referring to it."""
+        self.added.pop(gid, None)
+        self.removed.add(gid)
+
+    def members(self, gid, key):
+        entry = self.lists.get((gid, key))
+        if entry is None:
+            obj = self.added.get(gid)
+            if obj is None:
+                obj = self.project.objects[gid]
+            original = set(obj.get(key) or ())
+            # The appended values are an ordered set, a value that is
+            # appended again after its removal is still written once.
+            entry = self.lists[(gid, key)] = (original, set(original), OrderedDict())
+        return entry
+
+    def append(self, gid, key, value):
+        """Append value to the list under key of the object gid unless it
+        is in there already, return if it was appended.
+        """
+        original, members, appended = self.members(gid, key)
+        if value in members:
+            return False
+        members.add(value)
+        if value not in original:
+            appended[value] = None
+        return True
+
+    def remove(self, gid, key, value):
+        """Remove value from the list under key of the object gid, return if it was in there."""
+        original, members, appended = self.members(gid, key)
+        if value not in members:
+            return False
+        members.discard(value)
+        return True
+
+    def add_file(self, path, group, buildphase=None, filetype=None, sourcetree='<group>'):
+        """Add a PBXFileReference to group and, with a buildphase, a PBXBuildFile
+        for it. Return the gids of the file reference and the build file.
+        """
+        fileref = {'isa': 'PBXFileReference', 'path': path, 'sourceTree': sourcetree}
+        if filetype is not None:
+            fileref['lastKnownFileType'] = filetype
+        filegid = self.add_object(fileref)
+        self.append(group, 'children', filegid)
+        buildgid = None
+        if buildphase is not None:
+            buildgid = self.add_object({'isa': 'PBXBuildFile', 'fileRef': filegid})
+            self.append(buildphase, 'files', buildgid)
+        return filegid, buildgid
+
+    def commit(self):
+        project = self.project
+        objects = project.objects
+        tracked = getattr(objects, 'tracker', None) is not None
+
+        if self.removed:
+            for gid in self.removed:
+                for source, keypath in project.referrers(gid):
+                    if source not in self.removed and isinstance(objects[source].get(keypath), list):
+                        self.remove(source, keypath, gid)
+            for gid in self.removed:
+                objects.pop(gid, None)
+
+        touched = set(self.removed)
+        for gid, obj in self.added.items():
+            objects[gid] = obj
+            touched.add(gid)
+
+        for (gid, key), (original, members, appended) in self.lists.items():
+            obj = objects.get(gid)
+            if obj is None:
+                continue
+            values = obj.get(key)
+            if values is None:
+                obj[key] = [v for v in appended if v in members]
+            elif original <= members:
+                values.extend(v for v in appended if v in members)
+            else:
+                obj[key] = [v for v in values if v in members] + [v for v in appended if v in members]
+            touched.add(gid)
+
+        if not tracked:
+            for gid in touched:
+                project.invalidate(gid)
+        self.added.clear()
+        self.removed.clear()
+        self.lists.clear()
+
+
+def reference_index(root):
+    """Return the ReferenceIndex of the project.
+    A tracked tree keeps its index, which is only updated for the
+    objects that were modified since the last call.
+    """
+    return Project(root).index('references', ReferenceIndex)
+
+
+def find_orphans(root):
+    """Return the sorted gids of the objects that can not be reached from
+    the rootObject by following the gid-valued strings and list elements.
+
+    The mark phase uses an explicit stack instead of recursion, so deeply
+    nested groups or long reference chains don't hit the recursion limit.
+    Every object and every reference is visited once.
+    """
+    objects = root['objects']
+    marked = set()
+    stack = [root.get('rootObject')]
+    while stack:
+        value = stack.pop()
+        if isinstance(value, dict):
+            stack.extend(value.values())
+        elif isinstance(value, (list, tuple)):
+            stack.extend(value)
+        elif value in objects and value not in marked:
+            marked.add(value)
+            stack.append(objects[value])
+    return sorted(gid for gid in objects if gid not in marked)
+
+
+# Keys whose gids belong to the objects of another project.
+EXTERNAL_REFERENCE_KEYS = frozenset(['remoteGlobalIDString'])
+
+
+def check_integrity(root):
+    """Return the sorted (gid, keypath, message) of the problems that make
+    a syntactically valid project unusable: a missing rootObject, objects
+    without isa and references to gids that are not in the objects.
+
+    All checks share one pass over the objects, the references are only
+    looked up in the key set of the objects.
+    """
+    problems = []
+    missing = []
+    objects = root.get('objects')
+    if not isinstance(objects, dict):
+        return [('', 'objects', 'the project has no objects')]
+
+    rootobject = root.get('rootObject')
+    if rootobject not in objects:
+        problems.append(('', 'rootObject', 'the rootObject %s is missing' % rootobject))
+
+    for gid, obj in objects.items():
+        if not isinstance(obj, dict):
+            problems.append((gid, '', 'the object is no dictionary'))
+            continue
+        if 'isa' not in obj:
+            problems.append((gid, 'isa', 'the object has no isa'))
+        for key, value in obj.items():
+            values = value if isinstance(value, list) else (value,)
+            for v in values:
+                if isinstance(v, (dict, list)):
+                    for keypath, target in object_references(v, (key,)):
+                        if target not in objects:
+                            missing.append((gid, keypath, target))
+                elif v not in objects and len(v) == 24 and is_global_id(v):
+                    # Most strings are found in the objects or are too short
+                    # or long for a gid, the regex is only for the rest.
+                    missing.append((gid, key, v))
+
+    for gid, keypath, target in missing:
+        if keypath not in EXTERNAL_REFERENCE_KEYS:
+            problems.append((gid, keypath, 'the referenced object %s is missing' % target))
+    problems.sort()
+    return problems
+
+
+def remove_orphans(root):
+    """Remove the unreachable objects from the project and return their sorted gids."""
+    orphans = find_orphans(root)
+    objects = root['objects']
+    for gid in orphans:
+        del objects[gid]
+    return orphans
+
+
+# ---------------------------------------------------------------
+# Three-way merge of projects at the granularity of objects and keys.
+
+def merge_lists(base, ours, theirs):
+    """Merge the elements both sides added to and removed from the base list,
+    the additions of theirs are placed after the element they follow in theirs
+    and the additions of ours after it.
+    Return None for lists with duplicates or unhashable elements.
+    """
+    try:
+        baseset, ourset, theirset = set(base), set(ours), set(theirs)
+    except TypeError:
+        return None
+    if len(baseset) != len(base) or len(ourset) != len(ours) or len(theirset) != len(theirs):
+        return None
+
+    merged = [v for v in ours if v in theirset or v not in baseset]
+    mergedset = set(merged)
+    additions = defaultdict(list)
+    anchor = None
+    for v in theirs:
+        if v in mergedset:
+            anchor = v
+        elif v not in baseset:
+            additions[anchor].append(v)
+    if not additions:
+        return merged
+
+    # The additions of theirs follow the additions of ours after the same element.
+    result = list(additions.get(None, ()))
+    pending = []
+    for v in merged:
+        if pending and (v in baseset or v in theirset):
+            result.extend(pending)
+            pending = []
+        result.append(v)
+        pending.extend(additions.get(v, ()))
+    result.extend(pending)
+    return result
+
+
+def merge_values(base, ours, theirs, gid, keypath, conflicts):
+    """Return the three-way merge of a value, None stands for a missing value.
+    When both sides changed it differently ours wins and the conflict
+    is appended to conflicts as (gid, keypath, message).
+    """
+    if ours == theirs:
+        return ours
+    if ours == base:
+        return theirs
+    if theirs == base:
+        return ours
+
+    if isinstance(ours, dict) and isinstance(theirs, dict):
+        if not isinstance(base, dict):
+            base = {}
+        merged = ours.__class__()
+        for key in chain(ours, (k for k in theirs if k not in ours)):
+            value = merge_values(base.get(key), ours.get(key), theirs.get(key), gid, keypath + (key,), conflicts)
+            if value is not None:
+                merged[key] = value
+        return merged
+
+    if isinstance(ours, list) and isinstance(theirs, list):
+        merged = merge_lists(base if isinstance(base, list) else [], ours, theirs)
+        if merged is not None:
+            return merged
+
+    if ours is None:
+        message = 'removed by ours and modified by theirs'
+        ours = theirs
+    elif theirs is None:
+        message = 'modified by ours and removed by theirs'
+    else:
+        message = 'modified differently by ours and theirs'
+    conflicts.append((gid, '.'.join(keypath), message))
+    return ours
+
+
+def merge_roots(base, ours, theirs):
+    """Return the merged tree of three parsed versions and the sorted list of
+    (gid, keypath, message) of the conflicts that were resolved with ours.
+
+    The objects are matched by their gid, only objects that differ between
+    the sides are merged key by key and lists like children or files
+    merge their additions and removals.
+    Objects that one side modified and the other removed are kept.
+    """
+    conflicts = []
+    merged = merge_values(dict((k, v) for k, v in base.items() if k != 'objects'),
+                          dict((k, v) for k, v in ours.items() if k != 'objects'),
+                          dict((k, v) for k, v in theirs.items() if k != 'objects'),
+                          '', (), conflicts)
+
+    baseobjects, ourobjects, theirobjects = base['objects'], ours['objects'], theirs['objects']
+    objects = ourobjects.__class__()
+    for gid in chain(ourobjects, (g for g in theirobjects if g not in ourobjects)):
+        ourobject, theirobject = ourobjects.get(gid), theirobjects.get(gid)
+        if ourobject == theirobject:
+            # The common case of an unchanged object is a single comparison.
+            obj = ourobject
+        else:
+            obj = merge_values(baseobjects.get(gid), ourobject, theirobject, gid, (), conflicts)
+        if obj is not None:
+            objects[gid] = obj
+    merged['objects'] = objects
+    conflicts.sort()
+    return merged, conflicts
+
+
+def merge(base, ours, theirs, projectname='', parsertype='normal'):
+    """Merge three versions of the content of a project.pbxproj.
+
+    Return the merged project in the Xcode plist format and the list of
+    conflicts, see merge_roots. If a version can not be parsed the
+    result is None and the conflicts hold a message for each such version.
+    """
+    roots = []
+    conflicts = []
+    for name, text in (('base', base), ('ours', ours), ('theirs', theirs)):
+        root, parseinfo = parse(text, parsertype=parsertype)
+        if root is None:
+            conflicts.append(('', '', 'the %s version can not be parsed' % name))
+        roots.append((root, parseinfo))
+    if conflicts:
+        return None, conflicts
+
+    root, conflicts = merge_roots(*[r for r, _ in roots])
+    return unparse(root, projectname=projectname, parseinfo=roots[1][1], disable_comments=None), conflicts
+
+
+# ---------------------------------------------------------------
+# Structural diff of projects, object by object.
 
-def unparse(root, format='xcode', projectname='', disable_comments=False, parseinfo=None):
+ObjectChange = namedtuple('ObjectChange', 'change gid keypath old new')
+
+
+def diff_values(a, b, gid, keypath, changes):
+    """Append the ObjectChanges between the values a and b, dicts are compared key by key."""
+    if not (isinstance(a, dict) and isinstance(b, dict)):
+        changes.append(ObjectChange('modified', gid, '.'.join(keypath), a, b))
+        return
+    for key in chain(a, (k for k in b if k not in a)):
+        va, vb = a.get(key), b.get(key)
+        if va == vb:
+            continue
+        if va is None:
+            changes.append(ObjectChange('added', gid, '.'.join(keypath + (key,)), None, vb))
+        elif vb is None:
+            changes.append(ObjectChange('removed', gid, '.'.join(keypath + (key,)), va, None))
+        else:
+            diff_values(va, vb, gid, keypath + (key,), changes)
+
+
+def diff_roots(a, b):
+    """Return the sorted ObjectChanges from the project a to the project b.
+
+    Objects are matched by their gid. An added or removed object is one
+    change with an empty keypath, a modified object has a change for every
+    added, removed or modified key, nested dicts like buildSettings are
+    compared key by key. Changes outside of the objects have an empty gid.
+    An unchanged object costs one comparison of the parsed values.
+    """
+    changes = []
+    diff_values(dict((k, v) for k, v in a.items() if k != 'objects'),
+                dict((k, v) for k, v in b.items() if k != 'objects'),
+                '', (), changes)
+    aobjects, bobjects = a['objects'], b['objects']
+    for gid, aobj in aobjects.items():
+        bobj = bobjects.get(gid)
+        if bobj is None:
+            changes.append(ObjectChange('removed', gid, '', aobj, None))
+        elif aobj != bobj:
+            diff_values(aobj, bobj, gid, (), changes)
+    for gid, bobj in bobjects.items():
+        if gid not in aobjects:
+            changes.append(ObjectChange('added', gid, '', None, bobj))
+    changes.sort(key=lambda c: (c.gid, c.keypath))
+    return changes
+
+
+def diff_text(value):
+    if isinstance(value, (text_type, binary_type)):
+        return unistr(value)
+    return unistr(json.dumps(value, sort_keys=True, ensure_ascii=False))
+
+
+def print_structural_diff(changes, a, b, format='text', fromfile='', tofile='', comments=None, fp=None):
+    """Write the changes of diff_roots(a, b) as unified text with a hunk per
+    object, as JSON or as a summary with the number of changed objects by isa.
+    comments are the gid comments to show next to the gids in the text.
+    """
+    if fp is None:
+        fp = sys.stdout
+    if format == 'json':
+        fp.write(unistr(json.dumps([c._asdict() for c in changes], indent=2, ensure_ascii=False)))
+        fp.write(unistr('\n'))
+        return
+
+    def isa_of(gid):
+        obj = b['objects'].get(gid) or a['objects'].get(gid) or {}
+        return obj.get('isa', '')
+
+    if format == 'summary':
+        counts = OrderedDict((change, 0) for change in ('added', 'removed', 'modified'))
+        by_isa = defaultdict(lambda: OrderedDict((change, 0) for change in counts))
+        for gid, objchanges in groupby(changes, key=lambda c: c.gid):
+            objchanges = list(objchanges)
+            change = objchanges[0].change if objchanges[0].keypath == '' and gid else 'modified'
+            counts[change] += 1
+            by_isa[isa_of(gid) if gid else '(project)'][change] += 1
+        outline('%d objects added, %d removed, %d modified' % tuple(counts.values()), fp=fp)
+        for isa in sorted(by_isa):
+            outline('%s: %s' % (isa, ', '.join('%d %s' % (n, change)
+                                               for change, n in by_isa[isa].items() if n)), fp=fp)
+        return
+    if format != 'text':
+        raise ValueError("Unknown format: '%s'" % format)
+
+    comments = comments or {}
+    outline('--- %s' % fromfile, fp=fp)
+    outline('+++ %s' % tofile, fp=fp)
+    for gid, objchanges in groupby(changes, key=lambda c: c.gid):
+        header = [gid] if gid else ['(project)']
+        if comments.get(gid):
+            header.append('/* %s */' % comments[gid])
+        header.append(isa_of(gid))
+        lines = []
+        for c in objchanges:
+            if c.keypath == '' and gid:
+                header.append(c.change)
+                obj = c.old if c.change == 'removed' else c.new
+                sign = '-' if c.change == 'removed' else '+'
+                lines.extend('%s%s = %s' % (sign, k, diff_text(v)) for k, v in obj.items())
+                continue
+            if c.old is not None:
+                lines.append('-%s = %s' % (c.keypath, diff_text(c.old)))
+            if c.new is not None:
+                lines.append('+%s = %s' % (c.keypath, diff_text(c.new)))
+        outline('@@ %s @@' % ' '.join(x for x in header if x), fp=fp)
+        for line in lines:
+            outline(line, fp=fp)
+
+
+def output_key(format, projectname, disable_comments, parseinfo):
+    """The unparse parameters that influence the output."""
+    num_comments = None
+    if disable_comments is None and parseinfo:
+        num_comments = parseinfo.get('num_comments')
+    return format, projectname, disable_comments, num_comments
+
+
+# ---------------------------------------------------------------
+
+def unparse(root, format='xcode', projectname='', disable_comments=False, parseinfo=None, workers=None,
+            cache_fragments=False):
     """Generate the content of a project.pbxproj.
 
     :type root: the root node of the tree.
-    :type format: 'xcode', 'xml', 'json'.
+    :type format: 'xcode', 'xml', 'json' or 'json-compact'.
     :type projectname: basename of the .xcodeproj.
     :type disable_comments: don't add comments after the gids.
     :type parseinfo: if you parsed the project you can pass this from the parse result.
                      we use this to guess if comments should be recreated.
-    :return:
+    :type workers: number of processes that render the sections of the 'objects' dict
+                   in parallel, only used for the 'xcode' format.
+    :type cache_fragments: keep the text of every object of a tracked tree for the next unparse
+                           which then only renders the modified objects. Only used for the 'xcode' format.
+    :return: the UTF-8 encoded output, None if root has no valid objectVersion.
+    """
+    if root is None:
+        raise ValueError("root is None")
+    unparserclass = unparsers.get(format)
+    if unparserclass is None:
+        raise ValueError('format must be one of [%s]' % ', '.join(output_formats))
+    tracker = getattr(root, 'tracker', None)
+    if tracker is not None:
+        key = output_key(format, projectname, disable_comments, parseinfo)
+        output = tracker.source_output(key)
+        if output is not None:
+            return output
+
+    unparser = unparserclass(root)
+    text = unparser.unparse(root, projectname=projectname, disable_comments=disable_comments, parseinfo=parseinfo,
+                            workers=workers, cache_fragments=cache_fragments)
+    if text is None:
+        return None
+    output = bytestr(text)
+    if tracker is not None:
+        output = tracker.register_output(key, output)
+    return output
+
+
+def unparse_to(fp, root, format='xcode', projectname='', disable_comments=False, parseinfo=None, workers=None,
+               cache_fragments=False):
+    """Like unparse() but writes the UTF-8 encoded output into the binary file object fp.
+    Formats that support it are written in chunks without keeping
+    the whole output in memory.
+
+    :return: the number of bytes written.
     """
     if root is None:
         raise ValueError("root is None")
     unparserclass = unparsers.get(format)
     if unparserclass is None:
         raise ValueError('format must be one of [%s]' % ', '.join(output_formats))
+    tracker = getattr(root, 'tracker', None)
+    if tracker is not None:
+        output = tracker.source_output(output_key(format, projectname, disable_comments, parseinfo))
+        if output is not None:
+            writer = ChunkWriter(fp)
+            writer.write(output)
+            return writer.numbytes
+
     unparser = unparserclass(root)
-    text = unparser.unparse(root, projectname=projectname, disable_comments=disable_comments, parseinfo=parseinfo)
-    return bytestr(text)
+    return unparser.unparse_to(fp, root, projectname=projectname, disable_comments=disable_comments,
+                               parseinfo=parseinfo, workers=workers, cache_fragments=cache_fragments)
+
+
+def gid_comments(root, projectname=''):
+    """Return a dict with the comments that unparse() in the 'xcode' format
+    would write after the gids in the project, without creating the output.
+    Gids that are written without a comment map to ''.
+
+    :type root: the root node of the tree.
+    :type projectname: basename of the .xcodeproj.
+    :return: the dict or None if the root has no valid objectVersion.
+    """
+    if root is None:
+        raise ValueError("root is None")
+    return Unparser(root).gid_comments(root, projectname=projectname)
 
 
 # noinspection PySetFunctionToLiteral
 class Unparser(object):
-    """Creates the text representation from the parsed tree.
+    """Creates the UTF-8 encoded representation from the parsed tree.
+
+    The text fragments are encoded in chunks between the objects
+    and handed to self.write, so the output never exists as text
+    and bytes at the same time.
     """
 
     header = '// !$*UTF8*$!\n'
     trailer = '\n'
 
+    # Number of text fragments collected before they are encoded.
+    chunk_fragments = 8192
+
     keys_without_comments = frozenset([
         'remoteGlobalIDString',
         'TestTargetID',
@@ -874,6 +2304,8 @@ class Unparser(object):
                               'XCConfigurationList.buildConfigurations',
                               'XCVersionGroup.children',
                               'XCVersionGroup.currentVersion'])
+    # The keypaths inside of objects that lead to a commented keypath.
+    commentpath_prefixes = frozenset(path.rsplit('.', 1)[0] for path in commentpaths if path.count('.') > 1)
 
     def __init__(self, root):
         if root is None:
@@ -886,21 +2318,47 @@ class Unparser(object):
         self.section_for_file = {}
         self.build_configuration_lists = {}
         self.gidcomments = {}
+        self.comment_tables = None
+        self.looked_up = None
 
         self.outputbuffer = None
+        self.write = None
         self.projectname = None
         self.disable_comments = None
         self.version = None
         self.last_userhash = None
+        self.workers = None
+        self.cache_fragments = False
+        self.fragment_cache = None
+        self.used_comments = None
+
+    def unparse(self, root, projectname='', disable_comments=False, parseinfo=None, workers=None,
+                cache_fragments=False):
+        """Return the UTF-8 encoded output."""
+        chunks = []
+        if not self.unparse_with(chunks.append, root, projectname, disable_comments, parseinfo, workers,
+                                 cache_fragments):
+            return None
+        return b''.join(chunks)
 
-    def unparse(self, root, projectname='', disable_comments=False, parseinfo=None):
-        if root is None:
+    def unparse_to(self, fp, root, projectname='', disable_comments=False, parseinfo=None, workers=None,
+                   cache_fragments=False):
+        writer = ChunkWriter(fp)
+        if not self.unparse_with(writer.write, root, projectname, disable_comments, parseinfo, workers,
+                                 cache_fragments):
             return None
+        return writer.numbytes
+
+    def unparse_with(self, write, root, projectname, disable_comments, parseinfo, workers, cache_fragments):
+        """Render the tree and pass the encoded output in chunks to write."""
+        if root is None:
+            return False
         try:
             self.version = int(root.get('objectVersion'))
         except TypeError:
-            return None
+            return False
         self.outputbuffer = []
+        self.write = write
 
         if projectname is not None:
             projectname = decode_utf8_or_sys(projectname)
@@ -908,25 +2366,95 @@ class Unparser(object):
 
         self.disable_comments = disable_comments
         self.last_userhash = None
+        self.workers = workers
+        self.cache_fragments = cache_fragments
         self.set_comment_handling(disable_comments, parseinfo)
 
         self.create_lookup_tables()
         self.print_root(root, indent=0)
-        return self.getoutput()
+        self.flush_output(force=True)
+        self.write = None
+        return True
 
-    def emit(self, s):
-        self.outputbuffer.append(s)
-
-    @staticmethod
-    def getmember(obj, name):
+    def gid_comments(self, root, projectname=''):
+        """Walk the tree like emit_node() does, but only collect the comments."""
         try:
-            return obj.get(name)
-        except AttributeError:
+            self.version = int(root.get('objectVersion'))
+        except TypeError:
             return None
+        if projectname is not None:
+            projectname = decode_utf8_or_sys(projectname)
+        self.projectname = projectname
+        self.disable_comments = not self.has_comments()
+        self.create_lookup_tables()
+        comments = {}
+        for k, v in root.items():
+            if k == 'objects' and isinstance(v, dict):
+                self.collect_objects_comments(v, comments)
+            else:
+                self.collect_gid_comments({k: v}, comments)
+        return comments
+
+    def collect_objects_comments(self, objects, comments):
+        """Inside of the objects only the keys of the few commented keypaths
+        can contain gids with comments, so we skip all other keys.
+        """
+        keypath = self.keypath = ['objects']
+        commentpaths = self.commentpaths
+        prefixes = self.commentpath_prefixes
+        for gid, obj in objects.items():
+            keypath.append(gid)
+            if is_global_id(gid):
+                comments[gid] = self.gid_comment(gid) or ''
+            if isinstance(obj, dict):
+                isa = self.get_isa(obj) or gid
+                for k, v in obj.items():
+                    path = isa + '.' + ((k in objects and self.get_isa(objects[k])) or k)
+                    if path in commentpaths or path in prefixes:
+                        self.collect_gid_comments({k: v}, comments)
+            elif isinstance(obj, (list, tuple)):
+                self.collect_gid_comments(obj, comments)
+            keypath.pop()
+        self.keypath = []
+
+    def collect_gid_comments(self, node, comments):
+        """Only recurse into containers, most values are plain strings."""
+        keypath = self.keypath
+        if isinstance(node, dict):
+            for k, v in node.items():
+                keypath.append(k)
+                if is_global_id(k) and self.valid_comment_keypath():
+                    comments[k] = self.gid_comment(k) or ''
+                if isinstance(v, (dict, list, tuple)):
+                    self.collect_gid_comments(v, comments)
+                elif is_global_id(v) and self.valid_comment_keypath():
+                    comments[v] = self.gid_comment(v) or ''
+                keypath.pop()
+        else:
+            for v in node:
+                if isinstance(v, (dict, list, tuple)):
+                    self.collect_gid_comments(v, comments)
+                elif is_global_id(v) and self.valid_comment_keypath():
+                    comments[v] = self.gid_comment(v) or ''
+
+    def emit(self, s):
+        self.outputbuffer.append(s)
+
+    def flush_output(self, force=False):
+        if force or len(self.outputbuffer) >= self.chunk_fragments:
+            self.write(bytestr(''.join(self.outputbuffer)))
+            del self.outputbuffer[:]
+
+    @staticmethod
+    def getmember(obj, name):
+        try:
+            return obj.get(name)
+        except AttributeError:
+            return None
+
+    def getoutput(self):
+        return ''.join(self.outputbuffer)
 
-    def getoutput(self):
-        return ''.join(self.outputbuffer)
-
     def set_comment_handling(self, disable_comments, parseinfo):
         if disable_comments is not None:
             self.disable_comments = disable_comments
@@ -950,18 +2478,31 @@ class Unparser(object):
         """When we generate comments we'd get quadratic behaviour
         to find file sections and buildconfigurations.
         Build lookup tables to avoid this.
+        A tracked tree keeps its tables so we only update them.
         """
-        for obj in self.objects.values():
-            files = self.getmember(obj, 'files')
-            if isinstance(files, list):
-                name = self.get_name(obj)
-                if name is None:
-                    name = self.buildphasename(self.getmember(obj, 'isa'))
-                for f in files:
-                    self.section_for_file[f] = name
-            bcl = self.getmember(obj, 'buildConfigurationList')
-            if bcl is not None:
-                self.build_configuration_lists[bcl] = obj
+        tracker = getattr(self.objects, 'tracker', None)
+        if tracker is None:
+            tables = CommentTables()
+            tables.rebuild(self)
+        else:
+            tables = tracker.indexes.get('comments')
+            if tables is None:
+                tables = tracker.indexes['comments'] = CommentTables(incremental=True)
+            tables.update(self, tracker)
+        self.comment_tables = tables
+        self.section_for_file = tables.section_for_file
+        self.build_configuration_lists = tables.build_configuration_lists
+        self.gidcomments = tables.gidcomments
+
+    def lookup_object(self, gid):
+        """The objects the comments are made of are looked up here,
+        so we know which objects a comment depends on.
+        """
+        if self.looked_up is not None:
+            self.looked_up.append(gid)
+        obj = self.objects.get(gid)
+        # Anything but a dict has no isa to make a comment of.
+        return obj if isinstance(obj, dict) else None
 
     @staticmethod
     def buildphasename(name):
@@ -994,7 +2535,7 @@ class Unparser(object):
              or self.name_for_object(obj))
 
     def build_configuration(self, bcuuid):
-        obj = self.objects.get(bcuuid)
+        obj = self.lookup_object(bcuuid)
         if obj is None:
             return None
         if obj.get('isa') != 'XCConfigurationList':
@@ -1017,7 +2558,7 @@ class Unparser(object):
         targets = self.getmember(obj, 'targets')
         if isinstance(targets, list):
             for uuid in targets:
-                name = self.name_for_object(self.objects.get(uuid))
+                name = self.name_for_object(self.lookup_object(uuid))
                 if name is not None:
                     return name
         return None
@@ -1037,7 +2578,7 @@ class Unparser(object):
             return None
         return (self.get_name(obj)
              or self.getmember(obj, 'path')
-             or self.name_for_object(self.objects.get(self.getmember(obj, 'fileRef')))
+             or self.name_for_object(self.lookup_object(self.getmember(obj, 'fileRef')))
              or self.name_of_first_target(obj))
 
     def comment_for_value(self, v):
@@ -1047,23 +2588,40 @@ class Unparser(object):
         if not self.valid_comment_keypath():
             return None
 
-        comment = self.gidcomments.get(v)
+        comment = self.gid_comment(v)
+        if self.used_comments is not None:
+            self.used_comments.append((v, comment or ''))
+        return comment
+
+    def gid_comment(self, gid):
+        """Once we know that a gid gets a comment at all, the comment
+        only depends on the object graph, so it is computed once per gid.
+        """
+        comment = self.gidcomments.get(gid)
         if comment is not None:
             return comment
 
+        incremental = self.comment_tables is not None and self.comment_tables.incremental
+        if incremental:
+            self.looked_up = []
+
         comment = None
-        buildconf = self.build_configuration(v)
+        buildconf = self.build_configuration(gid)
         if buildconf is not None:
             comment = buildconf
         else:
-            obj = self.objects.get(v)
+            obj = self.lookup_object(gid)
             if obj is not None and isinstance(obj, dict):
                 comment = self.comment_for_obj(obj)
-                section = self.section_for_file.get(v)
+                section = self.section_for_file.get(gid)
                 if section is not None:
                     comment = "%s in %s" % (comment or '(null)', section)
 
-        self.gidcomments[v] = comment or ''
+        if incremental:
+            self.comment_tables.record_dependencies(gid, self.looked_up)
+            self.looked_up = None
+
+        self.gidcomments[gid] = comment or ''
         return comment
 
     def valid_comment_keypath(self):
@@ -1154,22 +2712,76 @@ class Unparser(object):
     def ungrouped_objects_sortkey(kv):
         return kv[0]
 
+    @staticmethod
+    def items_sorted_by_key(dictionary):
+        """Projects written by Xcode and parsed into ordered dicts are
+        already in canonical order. Checking the keys is linear and much
+        cheaper than sorting the (key, value) tuples so we only sort when we must.
+        """
+        keys = list(dictionary)
+        if keys == sorted(keys):
+            return dictionary.items()
+        return sorted(dictionary.items(), key=itemgetter(0))
+
+    def grouped_objects_items(self, objects):
+        """Sort the 'objects' dict by (isa, gid) via buckets per isa.
+        Only the few isa names and the gids within each bucket
+        need sorting which is linear when they are already in order.
+        If the objects arrive in canonical order we return them unchanged.
+        """
+        buckets = {}
+        bucketorder = []
+        previsa = None
+        contiguous = True
+        try:
+            for item in objects.items():
+                isa = item[1].get('isa')
+                if isa != previsa or not bucketorder:
+                    bucket = buckets.get(isa)
+                    if bucket is None:
+                        buckets[isa] = bucket = []
+                        bucketorder.append(isa)
+                    else:
+                        contiguous = False
+                    previsa = isa
+                bucket.append(item)
+        except AttributeError:
+            return sorted(objects.items(), key=self.objects_sortkey)
+
+        canonical = contiguous and bucketorder == sorted(bucketorder)
+        for isa in bucketorder:
+            bucket = buckets[isa]
+            gids = [gid for gid, _ in bucket]
+            if gids != sorted(gids):
+                bucket.sort(key=itemgetter(0))
+                canonical = False
+        if canonical:
+            return objects.items()
+
+        items = []
+        for isa in sorted(bucketorder):
+            items.extend(buckets[isa])
+        return items
+
     def sorted_items(self, dictionary):
         if self.keypath == ['objects']:
             # This is the 'objects' dict which we sort by (isa, gid) into sections.
             if self.has_ungrouped_objects_sort():
-                sortkey = self.ungrouped_objects_sortkey
-            else:
-                sortkey = self.objects_sortkey
-        else:
-            sortkey = None
-            if self.has_leading_isa():
-                isa = dictionary.get('isa')
-                if isa is not None:
-                    items = [('isa', isa)]
-                    items.extend(sorted(x for x in dictionary.items() if x[0] != 'isa'))
-                    return items
-        return sorted(dictionary.items(), key=sortkey)
+                return self.items_sorted_by_key(dictionary)
+            return self.grouped_objects_items(dictionary)
+
+        if self.has_leading_isa():
+            isa = dictionary.get('isa')
+            if isa is not None:
+                keys = list(dictionary)
+                if keys[0] == 'isa':
+                    rest = keys[1:]
+                    if rest == sorted(rest):
+                        return dictionary.items()
+                items = [('isa', isa)]
+                items.extend(sorted((x for x in dictionary.items() if x[0] != 'isa'), key=itemgetter(0)))
+                return items
+        return self.items_sorted_by_key(dictionary)
 
     def emit_value(self, v):
         v = quoted_string(v)
@@ -1230,21 +2842,159 @@ class Unparser(object):
     def emit_map(self, node, indent):
         self.emit('{')
         self.emit_prologue()
+        if self.keypath == ['objects']:
+            self.emit_objects(node, indent)
+        else:
+            for k, v in self.sorted_items(node):
+                self.emit_map_entry(k, v, indent)
+        self.emit_leading_separator(indent)
+        self.emit('}')
+
+    def emit_map_entry(self, k, v, indent):
+        self.keypath.append(k)
+        self.emit_leading_separator(indent + 1)
+        self.emit_kvpair(k, v, indent + 1)
+        self.emit(';')
+        self.emit_trailing_separator()
+        self.keypath.pop()
+
+    def emit_objects(self, node, indent):
+        items = self.sorted_items(node)
+        tracker = getattr(node, 'tracker', None)
+        if self.cache_fragments and tracker is not None:
+            cache = tracker.indexes.get('fragments')
+            if cache is None:
+                cache = tracker.indexes['fragments'] = FragmentCache()
+            cache.prepare(self, tracker)
+            self.fragment_cache = cache
+            emit_entry = self.emit_cached_map_entry
+        elif self.workers is not None and self.workers > 1 and not self.has_userhash_comments():
+            self.emit_objects_parallel(items, indent)
+            return
+        else:
+            emit_entry = self.emit_map_entry
+
         began_sections = False
-        sections = self.keypath == ['objects'] and not self.disable_comments
-        for k, v in self.sorted_items(node):
+        sections = not self.disable_comments
+        for k, v in items:
             self.emit_userhash_comments(k)
-            self.keypath.append(k)
             began_sections = sections and (self.begin_section(v) or began_sections)
-            self.emit_leading_separator(indent + 1)
-            self.emit_kvpair(k, v, indent + 1)
-            self.emit(';')
-            self.emit_trailing_separator()
-            self.keypath.pop()
+            emit_entry(k, v, indent)
+            self.flush_output()
+        if began_sections:
+            self.close_section()
+
+    def emit_cached_map_entry(self, k, v, indent):
+        """Copy the text of an object from the fragment cache if the
+        object is unchanged and so are the comments in its text.
+        Otherwise render it and remember the comments it contains.
+        """
+        cache = self.fragment_cache
+        stamp = cache.stamp(k)
+        fragment = cache.fragments.get(k)
+        if fragment is not None and fragment[0] == stamp:
+            gid_comment = self.gid_comment
+            for gid, comment in fragment[2]:
+                if (gid_comment(gid) or '') != comment:
+                    break
+            else:
+                self.emit(fragment[1])
+                return
+
+        start = len(self.outputbuffer)
+        self.used_comments = []
+        self.emit_map_entry(k, v, indent)
+        cache.fragments[k] = (stamp, ''.join(self.outputbuffer[start:]), tuple(self.used_comments))
+        self.used_comments = None
+
+    def emit_objects_parallel(self, items, indent):
+        """Every object in the 'objects' dict is rendered independently
+        of the others once the comments for its gids are known.
+        The sections are split into chunks that worker processes render
+        and we only add the section markers between the chunks.
+        Each chunk travels with just its own objects and comments,
+        not the whole object graph.
+        """
+        chunks = self.object_chunks(items, self.workers)
+        for gid in self.objects:
+            self.gid_comment(gid)
+        tasks = [(chunk, self.chunk_comments(chunk), indent) for chunk in chunks]
+
+        state = (self.version, self.projectname, self.disable_comments)
+        pool = multiprocessing.Pool(self.workers, initializer=init_objects_worker, initargs=(state,))
+        try:
+            texts = pool.map(render_objects_chunk, tasks)
+        finally:
+            pool.close()
+            pool.join()
+
+        began_sections = False
+        sections = not self.disable_comments
+        for chunk, text in zip(chunks, texts):
+            began_sections = sections and (self.begin_section(chunk[0][1]) or began_sections)
+            self.emit(text)
+            self.flush_output()
         if began_sections:
             self.close_section()
-        self.emit_leading_separator(indent)
-        self.emit('}')
+
+    def object_chunks(self, items, workers):
+        """Split the sorted objects into runs of the same isa
+        with big sections split into several chunks.
+        """
+        chunksize = max(1, len(items) // (4 * workers))
+        chunks = []
+        chunk = []
+        previsa = None
+        for item in items:
+            isa = self.get_isa(item[1])
+            if chunk and (isa != previsa or len(chunk) >= chunksize):
+                chunks.append(chunk)
+                chunk = []
+            chunk.append(item)
+            previsa = isa
+        if chunk:
+            chunks.append(chunk)
+        return chunks
+
+    def chunk_comments(self, chunk):
+        """Return the comments of all objects the chunk refers to,
+        so a worker gets along with only its own objects and never
+        needs the rest of the object graph.
+        Any other gid gets an empty comment in the worker as it does here.
+        """
+        gidcomments = self.gidcomments
+        comments = {}
+        pending = [obj for _, obj in chunk]
+        for gid, _ in chunk:
+            comments[gid] = gidcomments[gid]
+        while pending:
+            node = pending.pop()
+            if isinstance(node, dict):
+                values = list(node.keys()) + list(node.values())
+            elif isinstance(node, list):
+                values = node
+            else:
+                continue
+            for v in values:
+                if isinstance(v, (dict, list)):
+                    pending.append(v)
+                else:
+                    comment = gidcomments.get(v)
+                    if comment is not None:
+                        comments[v] = comment
+        return comments
+
+    def render_objects(self, chunk, comments, indent):
+        """Return the text for the (gid, object) items of a chunk
+        of the 'objects' dict without section markers.
+        """
+        self.objects = dict(chunk)
+        self.gidcomments = comments
+        self.outputbuffer = []
+        self.keypath = ['objects']
+        for gid, obj in chunk:
+            self.emit_map_entry(gid, obj, indent)
+        return self.getoutput()
 
     def emit_list(self, node, indent):
         self.emit('(')
@@ -1272,15 +3022,27 @@ class Unparser(object):
 
 
 class XMLUnparser(Unparser):
+    """Writes the XML plist format in chunks of text, either into
+    a list for unparse() or directly into a file for unparse_to().
+    """
+
     header = """<?xml version="1.0" encoding="UTF-8"?>
 <!DOCTYPE plist PUBLIC "-//Apple//DTD PLIST 1.0//EN" "http://www.apple.com/DTDs/PropertyList-1.0.dtd">
 <plist version="1.0">
 """
     trailer = '</plist>\n'
 
+    xml_escape_table = dict((ord(c), unistr(entity))
+                            for c, entity in [('&', '&amp;'), ('>', '&gt;'), ('<', '&lt;')])
+
+    # The number of text fragments that are collected before they
+    # are handed to the writer as one chunk.
+    chunk_fragments = 4096
+
     def __init__(self, root):
         super(XMLUnparser, self).__init__(root)
         self.disable_comments = True
+        self.indents = ['\t' * i for i in range(16)]
 
     def has_concise_format(self):
         return False
@@ -1288,69 +3050,222 @@ class XMLUnparser(Unparser):
     def has_leading_isa(self):
         return False
 
-    @staticmethod
-    def escape_tag_entities(data):
-        # For clarity we are not going to import xml.sax.saxutils
-        # for these three lines.
-        data = data.replace("&", "&amp;")
-        data = data.replace(">", "&gt;")
-        data = data.replace("<", "&lt;")
+    @classmethod
+    def escape_tag_entities(cls, data):
+        # Most strings in a project contain none of the three
+        # characters, those we return unchanged.
+        if '&' in data or '<' in data or '>' in data:
+            return data.translate(cls.xml_escape_table)
         return data
 
-    def emit_value(self, v):
-        self.emit('<string>')
-        self.emit(self.escape_tag_entities(v))
-        self.emit('</string>')
-
-    def emit_kvpair(self, k, v, indent):
-        self.emit('<key>')
-        self.emit(self.escape_tag_entities(k))
-        self.emit('</key>')
-        self.emit('\n')
-        self.emit_node(v, indent)
+    def indentation(self, depth):
+        indents = self.indents
+        while depth >= len(indents):
+            indents.append('\t' * len(indents))
+        return indents[depth]
 
-    def emit_map(self, node, indent):
-        if not node:
-            self.emit('<dict/>')
-            return
-        self.emit('<dict>')
-        self.emit('\n')
-        for k, v in self.sorted_items(node):
-            self.emit_indent(indent + 1)
-            self.emit_kvpair(k, v, indent + 1)
+    def unparse(self, root, projectname='', disable_comments=False, parseinfo=None, workers=None,
+                cache_fragments=False):
+        """Return the UTF-8 encoded output like every unparser,
+        encoded chunk by chunk.
+        """
+        chunks = []
+        if not self.write_plist(root, lambda text: chunks.append(bytestr(text))):
+            return None
+        return b''.join(chunks)
 
-        self.emit_indent(indent)
-        self.emit('</dict>')
+    def unparse_to(self, fp, root, projectname='', disable_comments=False, parseinfo=None, workers=None,
+                   cache_fragments=False):
+        writer = ChunkWriter(fp)
+        if not self.write_plist(root, writer.write):
+            return None
+        return writer.numbytes
 
-    def emit_list(self, node, indent):
-        if len(node) == 0:
-            self.emit('<array/>')
-            return
-        self.emit('<array>')
-        self.emit('\n')
-        for v in node:
-            self.emit_node(v, indent + 1)
-        self.emit_leading_separator(indent)
-        self.emit('</array>')
+    def write_plist(self, root, write):
+        """Hand the XML plist of root in chunks of text to write.
+        Returns False if the root has no valid objectVersion.
+        """
+        if root is None:
+            return False
+        try:
+            self.version = int(root.get('objectVersion'))
+        except TypeError:
+            return False
+
+        buf = []
+        emit = buf.append
+        escape = self.escape_tag_entities
+        indentation = self.indentation
+        sorted_items = self.items_sorted_by_key
+        chunk_fragments = self.chunk_fragments
+
+        def emit_node(node, depth):
+            if isinstance(node, dict):
+                if not node:
+                    emit('<dict/>')
+                    return
+                emit('<dict>\n')
+                inner = indentation(depth + 1)
+                for k, v in sorted_items(node):
+                    emit(inner + '<key>' + escape(k) + '</key>\n' + inner)
+                    emit_node(v, depth + 1)
+                    emit('\n')
+                    if len(buf) > chunk_fragments:
+                        write(''.join(buf))
+                        del buf[:]
+                emit(indentation(depth) + '</dict>')
+            elif isinstance(node, (list, tuple)):
+                if not node:
+                    emit('<array/>')
+                    return
+                emit('<array>\n')
+                inner = indentation(depth + 1)
+                for v in node:
+                    emit(inner)
+                    emit_node(v, depth + 1)
+                    emit('\n')
+                emit(indentation(depth) + '</array>')
+            else:
+                emit('<string>' + escape(node) + '</string>')
 
-    def emit_node(self, node, indent=0):
-        self.emit_indent(indent)
-        super(XMLUnparser, self).emit_node(node, indent=indent)
-        self.emit('\n')
+        if self.has_utf8_header():
+            emit(self.header)
+        emit_node(root, 0)
+        emit('\n')
+        emit(self.trailer)
+        write(''.join(buf))
+        return True
 
 
 class JSONUnparser(Unparser):
+    """The JSON output is deterministic: keys are sorted and
+    everything beyond ASCII is escaped.
+    """
+
+    indent = 2
+    separators = (',', ':')
+
+    # The number of fragments from the JSON encoder that are
+    # written as one chunk.
+    chunk_fragments = 8192
+
     def __init__(self, root):
         super(JSONUnparser, self).__init__(root)
         self.disable_comments = True
 
-    def unparse(self, root, projectname='', disable_comments=False, parseinfo=None):
+    def encoder(self):
+        return json.JSONEncoder(sort_keys=True,
+                                indent=self.indent,
+                                separators=self.separators)
+
+    def unparse(self, root, projectname='', disable_comments=False, parseinfo=None, workers=None,
+                cache_fragments=False):
+        """Return the UTF-8 encoded output like every unparser,
+        encoded chunk by chunk.
+        """
+        chunks = []
         try:
-            return json.dumps(root, sort_keys=True,
-                                    indent=2,
-                                    separators=(',', ':'))
+            self.write_json(root, lambda text: chunks.append(bytestr(text)))
         except ValueError:
             return None
+        return b''.join(chunks)
+
+    def unparse_to(self, fp, root, projectname='', disable_comments=False, parseinfo=None, workers=None,
+                   cache_fragments=False):
+        writer = ChunkWriter(fp)
+        self.write_json(root, writer.write)
+        return writer.numbytes
+
+    def write_json(self, root, write):
+        """Hand the JSON of root in chunks of text to write."""
+        fragments = self.encoder().iterencode(root)
+        while True:
+            chunk = ''.join(islice(fragments, self.chunk_fragments))
+            if not chunk:
+                break
+            write(chunk)
+
+
+class CompactJSONUnparser(JSONUnparser):
+    """JSON without any whitespace which is smaller and faster
+    to read for other tools.
+    """
+
+    indent = None
+
+    # The number of objects that are written as one chunk.
+    chunk_objects = 1024
+
+    def write_json(self, root, write):
+        """The incremental JSON encoder is written in Python while the
+        one-shot encoder is in C. We write the dicts of the first two levels
+        ourselves and use the one-shot encoder for everything below.
+        The result is the same as encoding the whole tree at once.
+        """
+        encode = self.encoder().encode
+        chunk_objects = self.chunk_objects
+
+        def write_node(node, depth):
+            if depth >= 2 or not isinstance(node, dict) or not node:
+                write(encode(node))
+                return
+            items = sorted(node.items(), key=itemgetter(0))
+            if depth == 0:
+                separator = '{'
+                for k, v in items:
+                    write(separator + encode(k) + ':')
+                    write_node(v, depth + 1)
+                    separator = ','
+                write('}')
+                return
+            # A run of sorted items is encoded as a dict of its own
+            # without the braces.
+            separator = '{'
+            for start in range(0, len(items), chunk_objects):
+                write(separator + encode(dict(items[start:start + chunk_objects]))[1:-1])
+                separator = ','
+            write('}')
+
+        write_node(root, 0)
+
+
+class ChunkWriter(object):
+    """Writes chunks of text UTF-8 encoded into a binary file object
+    and counts the bytes.
+    """
+
+    def __init__(self, fp):
+        self.fp = fp
+        self.numbytes = 0
+
+    def write(self, text):
+        data = bytestr(text)
+        numbytes = self.fp.write(data)
+        if numbytes is not None and numbytes != len(data):
+            raise IOError('Incomplete output, only %d of %d bytes written' % (numbytes, len(data)))
+        self.numbytes += len(data)
+
+
+# ---------------------------------------------------------------
+# The worker processes for the parallel unparse keep an unparser
+# per process which is set up once from the settings the parent ships.
+# Every chunk then brings its own objects and the comments they need.
+
+objects_worker = None
+
+
+def init_objects_worker(state):
+    global objects_worker
+    version, projectname, disable_comments = state
+    objects_worker = Unparser({'objects': {}})
+    objects_worker.version = version
+    objects_worker.projectname = projectname
+    objects_worker.disable_comments = disable_comments
+
+
+def render_objects_chunk(args):
+    chunk, comments, indent = args
+    return objects_worker.render_objects(chunk, comments, indent)
 
 
 # ---------------------------------------------------------------
@@ -1358,7 +3273,8 @@ class JSONUnparser(Unparser):
 unparsers = OrderedDict([
                         ('xcode', Unparser),
                         ('xml', XMLUnparser),
-                        ('json', JSONUnparser)])
+                        ('json', JSONUnparser),
+                        ('json-compact', CompactJSONUnparser)])
 output_formats = unparsers.keys()
 
 # ---------------------------------------------------------------
@@ -1404,6 +3320,28 @@ class UniqueXcodeIDGenerator(object):
               + self.big_endian_hex(refdate, 4)
               + self.big_endian_hex(self.randomconst, 4))
 
+    def generate_batch(self, num):
+        """Return a list of the next num gids, the same ones that many calls
+        of generate() would return as long as the refdate does not change.
+        Only the sequence number differs between the gids of a batch
+        so we format the constant fields just once.
+        """
+        refdate = self.refdatefunc()
+        if num <= 0:
+            return []
+        if refdate <= 0:
+            return [self.generate() for _ in range(num)]
+
+        fmt = (self.hexbyte(self.userhash) + self.hexbyte(self.pidbyte)
+               + '%04X'
+               + self.big_endian_hex(refdate, 4)
+               + self.big_endian_hex(self.randomconst, 4))
+        start = self.randomseq + 1
+        self.randomseq += num
+        self.initialseq = self.randomseq
+        self.lasttime = refdate
+        return [fmt % (seq & 0xffff) for seq in range(start, start + num)]
+
     @staticmethod
     def user_hash(username=None):
         userhash = 0
@@ -1479,6 +3417,15 @@ def datetime_from_utc(refdate):
 
 
 def generate_gids(num, username=None, pid=None, refdate=None):
+    for batch in generate_gid_batches(num, username=username, pid=pid, refdate=refdate):
+        for gid in batch:
+            yield gid
+
+
+def generate_gid_batches(num, username=None, pid=None, refdate=None):
+    """Like generate_gids() but yields the gids in lists of up to 65536.
+    Without num the batches never end.
+    """
     if refdate is not None:
         dt = datetime_from_utc(refdate)
         t = time.mktime(dt.timetuple())
@@ -1488,13 +3435,122 @@ def generate_gids(num, username=None, pid=None, refdate=None):
 
     clock = IDGeneratorClock(secs)
     generator = UniqueXcodeIDGenerator(username=username, pid=pid, refdatefunc=clock.getseconds)
-    for i in range(num):
-        gid = generator.generate()
-        # We can only generate 65536 different gids for the same second,
-        # then we go on to the next second.
-        yield gid
-        if i & 0xffff == 0xffff:
-            clock.tick()
+    # We can only generate 65536 different gids for the same second,
+    # then we go on to the next second.
+    while num is None or num > 0:
+        batch = generator.generate_batch(0x10000 if num is None else min(num, 0x10000))
+        yield batch
+        if num is not None:
+            num -= len(batch)
+        clock.tick()
+
+
+class GidAllocator(object):
+    """Hands out gids that exist in none of the given projects
+    and were not handed out before.
+
+    Pass the roots of all projects of a workspace that may reference
+    each other. With a reservation file several processes can allocate
+    gids for the same projects, every allocated gid is appended to the
+    file under an exclusive lock and the gids the other processes
+    appended are never handed out.
+
+    allocate_for() derives the gid from the identity of an object
+    instead, so generators that build the same objects again get the
+    same gids again.
+    """
+
+    def __init__(self, roots=(), username=None, pid=None, refdate=None, reservation_file=None):
+        if reservation_file is not None and fcntl is None:
+            raise ValueError('reservation files need file locking which is not available on this platform')
+        self.used = set()
+        for root in roots:
+            self.add_project(root)
+        self.candidates = generate_gids(None, username=username, pid=pid, refdate=refdate)
+        self.reservation_file = reservation_file
+        self.reservation_offset = 0
+
+    def add_project(self, root):
+        """Mark the gids of all objects in the project as used."""
+        self.used.update(root.get('objects', ()))
+        rootobject = root.get('rootObject')
+        if rootobject is not None:
+            self.used.add(rootobject)
+
+    def __contains__(self, gid):
+        return gid in self.used
+
+    def allocate(self):
+        return self.allocate_batch(1)[0]
+
+    def allocate_batch(self, num):
+        """Return a list of num new gids.
+        With a reservation file this takes the lock only once for all of them.
+        """
+        return self.reserve(lambda: self.take(num))
+
+    def allocate_for(self, identity):
+        """Return the gid for an object with the given identity,
+        a tuple of strings like its isa, its path and the gid of its parent.
+        The same identities allocated in the same order for the same
+        projects always get the same gids.
+        """
+        return self.allocate_for_batch([identity])[0]
+
+    def allocate_for_batch(self, identities):
+        return self.reserve(lambda: [self.take_for(identity) for identity in identities])
+
+    def reserve(self, take):
+        """Return the gids from take(), with a reservation file
+        only after the gids of the other processes are known.
+        """
+        if self.reservation_file is None:
+            return take()
+        with open(self.reservation_file, 'a+b') as f:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+            try:
+                f.seek(self.reservation_offset)
+                self.used.update(unistr(f.read()).split())
+                gids = take()
+                f.seek(0, os.SEEK_END)
+                f.write(bytestr(''.join(gid + '\n' for gid in gids)))
+                f.flush()
+                self.reservation_offset = f.tell()
+            finally:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+        return gids
+
+    def take(self, num):
+        gids = []
+        if num <= 0:
+            return gids
+        used = self.used
+        for gid in self.candidates:
+            if gid not in used:
+                used.add(gid)
+                gids.append(gid)
+                if len(gids) == num:
+                    break
+        return gids
+
+    def take_for(self, identity):
+        # A used gid may belong to an object with the same identity
+        # or be a real collision, either way we hash again with a counter.
+        gid = content_gid(identity)
+        counter = 0
+        while gid in self.used:
+            counter += 1
+            gid = content_gid(tuple(identity) + (text_type(counter),))
+        self.used.add(gid)
+        return gid
+
+
+def content_gid(identity):
+    """Return the gid made of the first 96 bits of the SHA-1 of the identity,
+    a sequence of strings that identify an object.
+    """
+    data = bytestr('\0'.join(unistr(part) for part in identity))
+    return hashlib.sha1(data).hexdigest()[:24].upper()
 
 
 def iprint(category, *args, **kwargs):
@@ -1522,8 +3578,8 @@ def reporterror(s, fp=None):
 reportwarning = reporterror
 
 def print_gids(num, username=None, pid=None, refdate=None):
-    for g in generate_gids(num, username=username, pid=pid, refdate=refdate):
-        outline(unistr(g))
+    for batch in generate_gid_batches(num, username=username, pid=pid, refdate=refdate):
+        outline(unistr('\n'.join(batch)))
     return OK
 
 
@@ -1535,13 +3591,44 @@ def comment_for_gid(giddict, gid):
     return None
 
 
+GidColumns = namedtuple('GidColumns', 'gids users pids seqs dates randoms')
+
+
+def decode_gids(gids):
+    """Take apart many gids at once and return a GidColumns of parallel
+    tuples with the gids and their fields. The gids are unpacked in one go
+    and the dates are kept as the seconds since 2001 that the gids contain,
+    use format_gid_dates() for the strings.
+    All gids must be made of hex digits, see is_hex_global_id().
+    """
+    gids = tuple(gids)
+    data = binascii.unhexlify(bytestr(''.join(gids)))
+    fields = struct.Struct('>' + 'BBHII' * len(gids)).unpack(data)
+    return GidColumns(gids, fields[0::5], fields[1::5], fields[2::5], fields[3::5], fields[4::5])
+
+
+def format_gid_dates(dates):
+    """Return the ISO 8601 strings for the dates from decode_gids(),
+    every distinct date is only formatted once.
+    """
+    formatted = {}
+    strings = []
+    for date in dates:
+        s = formatted.get(date)
+        if s is None:
+            epoch = UniqueXcodeIDGenerator.reftime_to_epoch(date)
+            s = formatted[date] = datetime.datetime.utcfromtimestamp(epoch).isoformat() + 'Z'
+        strings.append(s)
+    return strings
+
+
 def gidfields(giddict, gid):
-    parts = gid[:2], gid[2:4], gid[4:8], gid[8:16], gid[16:24]
-    parts = [UniqueXcodeIDGenerator.big_endian_number(x) for x in parts]
-    user, pid, seq, date, randomconst = parts
-    date = UniqueXcodeIDGenerator.reftime_to_epoch(date)
-    date = datetime.datetime.utcfromtimestamp(date)
-    date = date.isoformat() + 'Z'
+    columns = decode_gids([gid])
+    return gid_entry(giddict, gid, format_gid_dates(columns.dates)[0], columns.users[0], columns.pids[0],
+                     columns.seqs[0], columns.randoms[0])
+
+
+def gid_entry(giddict, gid, date, user, pid, seq, randomconst):
     comment = comment_for_gid(giddict, gid)
     d = OrderedDict([
         ('date', date),
@@ -1555,13 +3642,21 @@ def gidfields(giddict, gid):
     return d
 
 
-def gidsplit(gidseq, format='text', sort=False, buf=None):
+def gidsplit(gidseq, format='text', sort=False, buf=None, chunksize=65536):
     """This function prints a columnar JSON representation of the splitted gids
     with the date in front so one can sort and extract data with the
     usual command line tools as well as read the output as JSON.
+
+    The gids are consumed from gidseq and written in chunks, so any
+    number of them can be piped through in constant memory.
+    Sorting needs temporary files for huge numbers of gids.
     """
-    gids = [g for g in gidseq if is_global_id(g)]
-    if not gids:
+    gids = (g for g in gidseq if is_hex_global_id(g))
+    if sort:
+        gids = external_sort(gids)
+    chunks = iter(lambda: list(islice(gids, chunksize)), [])
+    first = next(chunks, None)
+    if first is None:
         return
 
     out = buf
@@ -1571,28 +3666,62 @@ def gidsplit(gidseq, format='text', sort=False, buf=None):
     def uniwrite(text):
         out.write(unistr(text))
 
-
-    if sort:
-        gids.sort()
-    entries = [gidfields(gidseq, gid) for gid in gids]
-
+    jsondumps = json.JSONEncoder().encode
+    if format == 'json':
+        uniwrite('{\n  "gids":[\n')
+    separator = ''
+    for chunk in chain([first], chunks):
+        columns = decode_gids(chunk)
+        rows = zip(chunk, format_gid_dates(columns.dates), columns.users, columns.pids, columns.seqs,
+                   columns.randoms)
+        if format == 'json':
+            # The entries are indented as if they were dumped as part of the whole.
+            entries = [json.dumps(gid_entry(gidseq, *row), sort_keys=True, indent=2, separators=(',', ':'))
+                       for row in rows]
+            uniwrite(separator + ',\n'.join('    ' + entry.replace('\n', '\n    ') for entry in entries))
+            separator = ',\n'
+        elif format == 'text':
+            lines = []
+            for gid, date, user, pid, seq, randomconst in rows:
+                line = '%s %3d %3d %10d %5d %24s' % (date, user, pid, randomconst, seq, gid)
+                comment = comment_for_gid(gidseq, gid)
+                if comment:
+                    line += ' ' + jsondumps(comment)
+                lines.append(line + '\n')
+            uniwrite(''.join(lines))
     if format == 'json':
-        root = {'gids': entries}
-        uniwrite(json.dumps(root, sort_keys=True, indent=2, separators=(',', ':')))
-        uniwrite('\n')
-    elif format == 'text':
-        formatstrings = {"date": "%s", "user": "%3d", "pid": "%3d", "random": "%10d",
-                         "seq": "%5d", "gid": "%24s", "comment": "%s"}
-        jsondumps = json.JSONEncoder().encode
-        for d in entries:
-            comment = d.get('comment')
-            if comment is not None:
-                d['comment'] = jsondumps(comment)
-            uniwrite(' '.join(formatstrings[k] % v for k, v in d.items()))
-            uniwrite('\n')
+        uniwrite('\n  ]\n}\n')
     return OK
 
 
+def external_sort(lines, chunksize=1000000):
+    """Yield the sorted strings from lines which must not contain newlines.
+    Runs of chunksize strings are sorted in memory and, if there is
+    more than one run, written into temporary files that are merged.
+    """
+    lines = iter(lines)
+    runs = []
+    try:
+        while True:
+            chunk = sorted(islice(lines, chunksize))
+            if not runs and len(chunk) < chunksize:
+                for line in chunk:
+                    yield line
+                return
+            if chunk:
+                run = tempfile.TemporaryFile(mode='w+')
+                run.writelines(line + '\n' for line in chunk)
+                run.seek(0)
+                runs.append(run)
+            if len(chunk) < chunksize:
+                break
+        for line in heapq.merge(*[(line[:-1] for line in run) for run in runs]):
+            yield line
+    finally:
+        for run in runs:
+            run.close()
+
+
 def giddump(args, parser):
     filenames = args.filename
     if len(filenames) > 1:
@@ -1609,19 +3738,247 @@ def giddump(args, parser):
 
     projectname = projectname_from_args(args, parser, filename, parseinfo.get('projectname'))
 
-    unparser = Unparser(root)
-    # Run the unparser to get the table of gidcomments
-    _ = unparser.unparse(root, projectname=projectname)
+    gidcomments = gid_comments(root, projectname=projectname)
 
     if args.outputfile is not None and args.outputfile != '-':
         destfilename = args.outputfile
         with codecs.open(destfilename, 'w', encoding='utf-8') as fp:
-            gidsplit(unparser.gidcomments, format=args.gid_format, sort=True, buf=fp)
+            gidsplit(gidcomments, format=args.gid_format, sort=True, buf=fp)
     else:
-        gidsplit(unparser.gidcomments, format=args.gid_format, sort=True)
+        gidsplit(gidcomments, format=args.gid_format, sort=True)
 
     return OK
 
+def orphans(args, parser):
+    filenames = args.filename
+    if args.remove and len(filenames) > 1 and args.outputfile is not None:
+        parser.error('Please specify no more than one filename when the orphans are removed into an outputfile')
+        # The return is only reached with a test parser from the unit tests.
+        return 1
+
+    exit_code = OK
+    if not filenames:
+        filenames = [STDIN]
+
+    for filename in filenames:
+        xcodeproj = data_from_filename(filename)
+        root, parseinfo = parse(xcodeproj, parsertype=args.parser)
+        report_parse_status(root, parseinfo, filename=filename)
+        if root is None:
+            exit_code = max(exit_code, PARSING_FAILED)
+            continue
+
+        projectname = projectname_from_args(args, parser, filename, parseinfo.get('projectname'))
+        t0 = time.time()
+        unreachable = find_orphans(root)
+        iprint(INFO_TIME, "Sweep time:", time.time() - t0)
+        if not unreachable:
+            continue
+
+        gidcomments = gid_comments(root, projectname=projectname) or {}
+        outline('The project file "%s" has %d unreachable objects:' % (filename, len(unreachable)))
+        for gid in unreachable:
+            comment = gidcomments.get(gid)
+            obj = root['objects'][gid]
+            isa = obj.get('isa', '') if isinstance(obj, dict) else ''
+            parts = [gid, '/* %s */' % comment if comment else '', isa]
+            outline('    ' + ' '.join(x for x in parts if x))
+
+        if not args.remove:
+            exit_code = max(exit_code, ERROR)
+            continue
+
+        remove_orphans(root)
+        unparse_args = dict(projectname=projectname, parseinfo=parseinfo, disable_comments=None)
+        if args.outputfile is not None:
+            destfilename = args.outputfile
+        elif filename == STDIN:
+            destfilename = STDOUT
+        else:
+            destfilename = filename
+
+        if destfilename == STDOUT:
+            exit_code = max(exit_code, write_project_stdout(root, **unparse_args))
+        else:
+            exit_code = max(exit_code, write_project_file(destfilename, root, **unparse_args))
+    return exit_code
+
+# ----------------------------------------------------------------------
+# The catalog is an SQLite database with the objects and gids of many projects.
+
+CATALOG_SCHEMA = """
+CREATE TABLE IF NOT EXISTS projects (
+    id INTEGER PRIMARY KEY,
+    filename TEXT UNIQUE NOT NULL,
+    name TEXT,
+    sha1 TEXT NOT NULL,
+    objectversion TEXT,
+    rootobject TEXT
+);
+CREATE TABLE IF NOT EXISTS objects (
+    project INTEGER NOT NULL,
+    gid TEXT NOT NULL,
+    isa TEXT,
+    name TEXT,
+    path TEXT,
+    comment TEXT
+);
+CREATE TABLE IF NOT EXISTS refs (
+    project INTEGER NOT NULL,
+    source TEXT NOT NULL,
+    keypath TEXT NOT NULL,
+    target TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS gids (
+    project INTEGER NOT NULL,
+    gid TEXT NOT NULL,
+    date TEXT,
+    user INTEGER,
+    pid INTEGER,
+    seq INTEGER,
+    random INTEGER
+);
+CREATE INDEX IF NOT EXISTS objects_project ON objects (project);
+CREATE INDEX IF NOT EXISTS objects_gid ON objects (gid);
+CREATE INDEX IF NOT EXISTS objects_isa ON objects (isa);
+CREATE INDEX IF NOT EXISTS refs_project ON refs (project);
+CREATE INDEX IF NOT EXISTS refs_target ON refs (target);
+CREATE INDEX IF NOT EXISTS gids_project ON gids (project);
+CREATE INDEX IF NOT EXISTS gids_gid ON gids (gid);
+CREATE INDEX IF NOT EXISTS gids_user_date ON gids (user, date);
+"""
+
+
+def catalog_rows(args):
+    """Read and take apart a project for the catalog.
+    Returns (filename, sha1, rows) with rows being None if the project
+    has the known sha1 or can't be read, parsed or taken apart, sha1
+    is None if it can't be read. This runs in worker processes.
+    """
+    filename, known_sha1 = args
+    try:
+        with open(filename, 'rb') as f:
+            xcodeproj = f.read()
+    except (IOError, OSError):
+        return filename, None, None
+    sha1 = hashlib.sha1(xcodeproj).hexdigest()
+    if sha1 == known_sha1:
+        return filename, sha1, None
+
+    # A single odd project must not abort the catalog run in the
+    # workers, it is counted as failed instead.
+    try:
+        return filename, sha1, project_catalog_rows(filename, xcodeproj)
+    except Exception:
+        return filename, sha1, None
+
+
+def project_catalog_rows(filename, xcodeproj):
+    """The catalog rows of a project, None if it can't be parsed."""
+    root, parseinfo = parse(xcodeproj)
+    if root is None or not isinstance(root.get('objects'), dict):
+        return None
+    objects = root['objects']
+    projectname = projectname_for_path(filename)
+    comments = gid_comments(root, projectname=projectname) or {}
+
+    objectrows = []
+    for gid, obj in objects.items():
+        if isinstance(obj, dict):
+            objectrows.append((gid, obj.get('isa'), obj.get('name'), obj.get('path'), comments.get(gid)))
+    gids = [gid for gid in objects if is_hex_global_id(gid)]
+    columns = decode_gids(gids)
+    gidrows = list(zip(gids, format_gid_dates(columns.dates), columns.users, columns.pids, columns.seqs,
+                       columns.randoms))
+    return {'project': (projectname, root.get('objectVersion'), root.get('rootObject')),
+            'objects': objectrows,
+            'refs': list(iter_references(objects)),
+            'gids': gidrows}
+
+
+def store_catalog_rows(db, filename, sha1, rows):
+    """Replace the catalog entries of one project in a single transaction."""
+    with db:
+        cursor = db.execute('SELECT id FROM projects WHERE filename = ?', (filename,))
+        row = cursor.fetchone()
+        name, objectversion, rootobject = rows['project']
+        if row is None:
+            cursor = db.execute('INSERT INTO projects (filename, name, sha1, objectversion, rootobject)'
+                                ' VALUES (?, ?, ?, ?, ?)', (filename, name, sha1, objectversion, rootobject))
+            project = cursor.lastrowid
+        else:
+            project = row[0]
+            db.execute('UPDATE projects SET name = ?, sha1 = ?, objectversion = ?, rootobject = ? WHERE id = ?',
+                       (name, sha1, objectversion, rootobject, project))
+            for table in ['objects', 'refs', 'gids']:
+                db.execute('DELETE FROM %s WHERE project = ?' % table, (project,))
+        db.executemany('INSERT INTO objects VALUES (%d, ?, ?, ?, ?, ?)' % project, rows['objects'])
+        db.executemany('INSERT INTO refs VALUES (%d, ?, ?, ?)' % project, rows['refs'])
+        db.executemany('INSERT INTO gids VALUES (%d, ?, ?, ?, ?, ?, ?)' % project, rows['gids'])
+
+
+def catalog_projects(dbfilename, paths, workers=None):
+    """Load the projects found in paths into the SQLite database dbfilename.
+    Paths can be project.pbxproj files or directories that are searched
+    for them. Projects whose content did not change since they were
+    loaded the last time are skipped. With workers the projects are
+    parsed by that many processes.
+
+    :return: a dict with the number of 'loaded', 'unchanged' and 'failed' projects.
+    """
+    filenames = []
+    for path in paths:
+        if os.path.isdir(path):
+            filenames.extend(find_projectfiles(path))
+        else:
+            filenames.append(path)
+    filenames = [os.path.abspath(filename) for filename in filenames]
+
+    db = sqlite3.connect(dbfilename)
+    try:
+        db.executescript(CATALOG_SCHEMA)
+        known = dict(db.execute('SELECT filename, sha1 FROM projects'))
+        tasks = [(filename, known.get(filename)) for filename in filenames]
+
+        if workers is not None and workers > 1:
+            pool = multiprocessing.Pool(workers)
+            results = pool.imap_unordered(catalog_rows, tasks)
+        else:
+            pool = None
+            results = (catalog_rows(task) for task in tasks)
+
+        counts = {'loaded': 0, 'unchanged': 0, 'failed': 0}
+        try:
+            for filename, sha1, rows in results:
+                if rows is not None:
+                    store_catalog_rows(db, filename, sha1, rows)
+                    counts['loaded'] += 1
+                elif sha1 is not None and sha1 == known.get(filename):
+                    counts['unchanged'] += 1
+                else:
+                    reporterror('The project file "%s" could not be read or parsed.' % filename)
+                    counts['failed'] += 1
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+    finally:
+        db.close()
+    return counts
+
+
+def catalog(args, parser):
+    if not args.filename:
+        parser.error('Please specify the project files or directories to catalog')
+        # The return is only reached with a test parser from the unit tests.
+        return 1
+
+    t0 = time.time()
+    counts = catalog_projects(args.catalog, args.filename, workers=args.workers)
+    iprint(INFO_TIME, "Catalog time:", time.time() - t0)
+    outline('%(loaded)d projects loaded, %(unchanged)d unchanged, %(failed)d failed' % counts)
+    return ERROR if counts['failed'] else OK
+
 # ----------------------------------------------------------------------
 
 
@@ -1648,10 +4005,246 @@ def unilines(text):
     return unistr(text).splitlines(True)
 
 
+# ----------------------------------------------------------------------
+# A line diff for large files. Patience diff anchors on the lines that are
+# unique on both sides, which in a project are nearly all lines because of
+# the gids, and Myers' algorithm handles the gaps between the anchors.
+
+MYERS_MAX_EDITS = 1000
+
+
+def myers_blocks(a, alo, ahi, b, blo, bhi, blocks):
+    """Append the matching blocks of the shortest edit script between
+    a[alo:ahi] and b[blo:bhi]. Return False without a result when it
+    takes more than MYERS_MAX_EDITS edits, so the range is a replacement.
+    """
+    n, m = ahi - alo, bhi - blo
+    maxd = min(n + m, MYERS_MAX_EDITS)
+    offset = maxd + 1
+    v = [0] * (2 * maxd + 3)
+    trace = []
+    done = False
+    for d in range(maxd + 1):
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and v[offset + k - 1] < v[offset + k + 1]):
+                x = v[offset + k + 1]
+            else:
+                x = v[offset + k - 1] + 1
+            y = x - k
+            while x < n and y < m and a[alo + x] == b[blo + y]:
+                x += 1
+                y += 1
+            v[offset + k] = x
+            if x >= n and y >= m:
+                done = True
+                break
+        trace.append(v[:])
+        if done:
+            break
+    if not done:
+        return False
+
+    # Walk back through the trace and collect the diagonals.
+    x, y = n, m
+    for d in range(len(trace) - 1, 0, -1):
+        vprev = trace[d - 1]
+        k = x - y
+        if k == -d or (k != d and vprev[offset + k - 1] < vprev[offset + k + 1]):
+            prevk = k + 1
+        else:
+            prevk = k - 1
+        prevx = vprev[offset + prevk]
+        prevy = prevx - prevk
+        size = min(x - prevx, y - prevy)
+        if size > 0:
+            blocks.append((alo + x - size, blo + y - size, size))
+        x, y = prevx, prevy
+    if x > 0:
+        blocks.append((alo, blo, x))
+    return True
+
+
+def patience_blocks(a, b):
+    """Return the sorted matching blocks (i, j, size) of the lists a and b."""
+    blocks = []
+    stack = [(0, len(a), 0, len(b))]
+    while stack:
+        alo, ahi, blo, bhi = stack.pop()
+        start = alo
+        while alo < ahi and blo < bhi and a[alo] == b[blo]:
+            alo += 1
+            blo += 1
+        if alo > start:
+            blocks.append((start, blo - (alo - start), alo - start))
+        end = ahi
+        while alo < ahi and blo < bhi and a[ahi - 1] == b[bhi - 1]:
+            ahi -= 1
+            bhi -= 1
+        if ahi < end:
+            blocks.append((ahi, bhi, end - ahi))
+        if alo == ahi or blo == bhi:
+            continue
+
+        # The lines that occur exactly once on both sides.
+        acount, bcount = {}, {}
+        for i in range(alo, ahi):
+            acount[a[i]] = i if a[i] not in acount else -1
+        for j in range(blo, bhi):
+            bcount[b[j]] = j if b[j] not in bcount else -1
+        pairs = [(i, bcount[a[i]]) for i in range(alo, ahi)
+                 if acount[a[i]] == i and bcount.get(a[i], -1) >= 0]
+
+        # The longest increasing subsequence of the positions in b
+        # by patience sorting are the anchors.
+        tops, tails, back = [], [], {}
+        for i, j in pairs:
+            pos = bisect_left(tops, j)
+            if pos == len(tops):
+                tops.append(j)
+                tails.append((i, j))
+            else:
+                tops[pos] = j
+                tails[pos] = (i, j)
+            back[(i, j)] = tails[pos - 1] if pos > 0 else None
+        if not tails:
+            # Without a match the range simply stays a replacement.
+            myers_blocks(a, alo, ahi, b, blo, bhi, blocks)
+            continue
+        anchor = tails[-1]
+        previous = (ahi, bhi)
+        while anchor is not None:
+            i, j = anchor
+            blocks.append((i, j, 1))
+            stack.append((i + 1, previous[0], j + 1, previous[1]))
+            previous = anchor
+            anchor = back[anchor]
+        stack.append((alo, previous[0], blo, previous[1]))
+    blocks.sort()
+    return blocks
+
+
+class LineMatcher(difflib.SequenceMatcher):
+    """A SequenceMatcher for lists of lines that finds its matching blocks
+    by patience diff, so get_opcodes() and get_grouped_opcodes() stay
+    fast on large files with many changes.
+    """
+
+    def __init__(self, a, b):
+        difflib.SequenceMatcher.__init__(self, None, a, b, autojunk=False)
+
+    def get_matching_blocks(self):
+        if self.matching_blocks is not None:
+            return self.matching_blocks
+        # Compare small ints instead of the lines.
+        ids = {}
+        a = [ids.setdefault(line, len(ids)) for line in self.a]
+        b = [ids.setdefault(line, len(ids)) for line in self.b]
+        merged = []
+        for i, j, size in patience_blocks(a, b):
+            if merged and merged[-1][0] + merged[-1][2] == i and merged[-1][1] + merged[-1][2] == j:
+                merged[-1] = (merged[-1][0], merged[-1][1], merged[-1][2] + size)
+            else:
+                merged.append((i, j, size))
+        merged.append((len(a), len(b), 0))
+        self.matching_blocks = [difflib.Match(*block) for block in merged]
+        return self.matching_blocks
+
+
+def format_range_unified(start, stop):
+    beginning = start + 1
+    length = stop - start
+    if length == 1:
+        return '%d' % beginning
+    if not length:
+        beginning -= 1
+    return '%d,%d' % (beginning, length)
+
+
+def unified_diff(a, b, fromfile='', tofile='', n=3):
+    """Yield the lines of a unified diff between the line lists a and b
+    in the same format as difflib.unified_diff.
+    """
+    started = False
+    for group in LineMatcher(a, b).get_grouped_opcodes(n):
+        if not started:
+            started = True
+            yield '--- %s\n' % fromfile
+            yield '+++ %s\n' % tofile
+        first, last = group[0], group[-1]
+        yield '@@ -%s +%s @@\n' % (format_range_unified(first[1], last[2]),
+                                   format_range_unified(first[3], last[4]))
+        for tag, i1, i2, j1, j2 in group:
+            if tag == 'equal':
+                for line in a[i1:i2]:
+                    yield ' ' + line
+                continue
+            if tag in ('replace', 'delete'):
+                for line in a[i1:i2]:
+                    yield '-' + line
+            if tag in ('replace', 'insert'):
+                for line in b[j1:j2]:
+                    yield '+' + line
+
+
+HTML_DIFF_TEMPLATE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>%(fromdesc)s</title>
+<style type="text/css">
+    table.diff {font-family: Courier; border: medium; border-collapse: collapse}
+    table.diff td {white-space: pre; padding: 0 4px}
+    .diff_header {background-color: #e0e0e0; text-align: right}
+    .diff_add {background-color: #aaffaa}
+    .diff_chg {background-color: #ffff77}
+    .diff_sub {background-color: #ffaaaa}
+</style>
+</head>
+<body>
+<table class="diff">
+<thead><tr><th colspan="2">%(fromdesc)s</th><th colspan="2">%(todesc)s</th></tr></thead>
+%(rows)s
+</table>
+</body>
+</html>
+"""
+
+
+def html_diff(a, b, fromdesc='', todesc='', numlines=2):
+    """Return an HTML page with the changed lines of a and b side by side
+    and numlines of context, like difflib.HtmlDiff(context=True) but
+    without the character level highlighting that is slow on large changes.
+    """
+    def cell(lines, index, cls):
+        if index is None:
+            return '<td class="diff_header"></td><td></td>'
+        text = escape_html(lines[index].rstrip('\r\n').expandtabs(4))
+        cls = ' class="%s"' % cls if cls else ''
+        return '<td class="diff_header">%d</td><td%s>%s</td>' % (index + 1, cls, text)
+
+    rows = []
+    for group in LineMatcher(a, b).get_grouped_opcodes(numlines):
+        rows.append('<tbody>')
+        for tag, i1, i2, j1, j2 in group:
+            for k in range(max(i2 - i1, j2 - j1)):
+                i = i1 + k if i1 + k < i2 else None
+                j = j1 + k if j1 + k < j2 else None
+                if tag == 'equal':
+                    left, right = cell(a, i, ''), cell(b, j, '')
+                else:
+                    left = cell(a, i, 'diff_chg' if tag == 'replace' else 'diff_sub')
+                    right = cell(b, j, 'diff_chg' if tag == 'replace' else 'diff_add')
+                rows.append('<tr>%s%s</tr>' % (left, right))
+        rows.append('</tbody>')
+    return HTML_DIFF_TEMPLATE % dict(fromdesc=escape_html(fromdesc or ''),
+                                     todesc=escape_html(todesc or ''),
+                                     rows='\n'.join(rows))
+
+
 def print_unified_diff(a, b, fp=None, **kwargs):
     if fp is None:
         fp = sys.stdout
-    for line in difflib.unified_diff(unilines(a), unilines(b), **kwargs):
+    for line in unified_diff(unilines(a), unilines(b), **kwargs):
         fp.write(unistr(line))
         if not line.endswith('\n'):
             fp.write(unistr('\n'))
@@ -1674,11 +4267,7 @@ def print_diff(a, b, difftype='unified', filename=None, fp=None):
     if difftype == 'unified':
         print_unified_diff(a, b, fromfile=filename, tofile='', n=3, fp=fp)
     elif difftype == 'html':
-        htmldiffer = difflib.HtmlDiff(tabsize=4)
-        html = htmldiffer.make_file(unilines(a), unilines(b),
-                                    fromdesc=filename,
-                                    todesc='',
-                                    context=True, numlines=2)
+        html = html_diff(unilines(a), unilines(b), fromdesc=filename, todesc='', numlines=2)
         htmlfilename = write_tempfile(html, suffix='.html', prefix=timestamp())
         reporterror('\nopen "%s"' % htmlfilename, fp=fp)
     elif difftype == 'opendiff':
@@ -1779,6 +4368,13 @@ def lint(args, parser):
             exit_code = max(exit_code, LINT_FAILED)
             continue
 
+        problems = check_integrity(root)
+        for gid, keypath, message in problems:
+            where = ' '.join(x for x in (gid, keypath) if x)
+            reportmessage('The project file "%s" is broken at %s: %s.' % (filename, where, message))
+        if problems:
+            exit_code = max(exit_code, LINT_FAILED)
+
         projectname = projectname_from_args(args, parser, filename, parseinfo.get('projectname'))
         proj = unparse(root, projectname=projectname)
         if xcodeproj != proj:
@@ -1787,6 +4383,136 @@ def lint(args, parser):
     return exit_code
 
 
+def merge_files(args, parser):
+    filenames = args.filename
+    if len(filenames) != 3:
+        parser.error('Please specify the base, our and their version of the project to merge')
+        # The return is only reached with a test parser from the unit tests.
+        return 1
+
+    roots = []
+    for filename in filenames:
+        root, parseinfo = parse(data_from_filename(filename), parsertype=args.parser)
+        report_parse_status(root, parseinfo, filename=filename)
+        if root is None:
+            return PARSING_FAILED
+        roots.append((root, parseinfo))
+
+    # As a git merge driver our version is a temporary file, so
+    # the name of the project may only be known from its comments.
+    oursfilename = filenames[1]
+    parseinfo = roots[1][1]
+    projectname = (args.projectname or projectname_for_path(args.outputfile or oursfilename)
+                   or parseinfo.get('projectname') or '')
+
+    t0 = time.time()
+    root, conflicts = merge_roots(*[r for r, _ in roots])
+    iprint(INFO_TIME, "Merge time:", time.time() - t0)
+    for gid, keypath, message in conflicts:
+        where = ' '.join(x for x in (gid, keypath) if x)
+        reportmessage('Conflict at %s: %s, keeping ours.' % (where, message))
+
+    unparse_args = dict(projectname=projectname, parseinfo=parseinfo, disable_comments=None)
+    destfilename = args.outputfile or oursfilename
+    if destfilename == STDOUT:
+        exit_code = write_project_stdout(root, **unparse_args)
+    else:
+        exit_code = write_project_file(destfilename, root, **unparse_args)
+    if exit_code != OK:
+        return exit_code
+    return MERGE_CONFLICTS if conflicts else OK
+
+
+def structural_diff(args, parser):
+    filenames = args.filename
+    if len(filenames) != 2:
+        parser.error('Please specify the two project files to diff')
+        # The return is only reached with a test parser from the unit tests.
+        return 1
+
+    roots = []
+    for filename in filenames:
+        root, parseinfo = parse(data_from_filename(filename), parsertype=args.parser)
+        report_parse_status(root, parseinfo, filename=filename)
+        if root is None:
+            return PARSING_FAILED
+        roots.append(root)
+
+    t0 = time.time()
+    changes = diff_roots(*roots)
+    iprint(INFO_TIME, "Diff time:", time.time() - t0)
+    if not changes:
+        return OK
+
+    comments = None
+    if args.diff_format == 'text':
+        projectname = args.projectname or projectname_for_path(filenames[1]) or ''
+        # Without a valid objectVersion a project has no comments.
+        comments = gid_comments(roots[0], projectname=projectname) or {}
+        comments.update(gid_comments(roots[1], projectname=projectname) or {})
+    print_structural_diff(changes, roots[0], roots[1], format=args.diff_format,
+                          fromfile=filenames[0], tofile=filenames[1], comments=comments)
+    return DIFF_DIFFERENCES
+
+
+def write_file_safely(destfilename, writefunc):
+    """Let writefunc write into a temporary file next to destfilename
+    that only replaces destfilename after writefunc succeeded.
+    This way a failure during a chunked write never leaves
+    a truncated project behind.
+    Like the unparsers writefunc returns None if it had nothing to
+    write, then destfilename is left alone and None is returned.
+    """
+    destdir, destname = os.path.split(os.path.abspath(destfilename))
+    fd, tmpfilename = tempfile.mkstemp(dir=destdir, prefix='.' + destname, suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            result = writefunc(f)
+        if result is None:
+            os.remove(tmpfilename)
+            return None
+        if os.path.exists(destfilename):
+            shutil.copymode(destfilename, tmpfilename)
+        else:
+            umask = os.umask(0)
+            os.umask(umask)
+            os.chmod(tmpfilename, 0o666 & ~umask)
+        replace_file(tmpfilename, destfilename)
+    except:
+        os.remove(tmpfilename)
+        raise
+    return result
+
+
+def write_project_file(destfilename, root, **unparse_args):
+    """Write root safely into destfilename and report any failure.
+
+    :return: OK or CONVERT_OUTPUT_FAILED.
+    """
+    try:
+        numbytes = write_file_safely(destfilename, lambda f: unparse_to(f, root, **unparse_args))
+    except (IOError, OSError) as e:
+        reporterror('Writing "%s" failed: %s' % (destfilename, e))
+        return CONVERT_OUTPUT_FAILED
+    if numbytes is None:
+        reporterror('Writing "%s" failed: the project has no valid objectVersion' % destfilename)
+        return CONVERT_OUTPUT_FAILED
+    return OK
+
+
+def write_project_stdout(root, **unparse_args):
+    """Write root to stdout and report any failure.
+
+    :return: OK or CONVERT_OUTPUT_FAILED.
+    """
+    output = unparse(root, **unparse_args)
+    if output is None:
+        reporterror('Writing the project failed: it has no valid objectVersion')
+        return CONVERT_OUTPUT_FAILED
+    sys.stdout.write(unistr(output))
+    return OK
+
+
 def convert(args, parser):
     filenames = args.filename
     if len(filenames) > 1:
@@ -1810,11 +4536,11 @@ def convert(args, parser):
         root['objectVersion'] = version
 
     projectname = projectname_from_args(args, parser, filename, parseinfo.get('projectname'))
-    proj = unparse(root,
-                   format=args.convert,
-                   projectname=projectname,
-                   disable_comments=args.comments == 'no',
-                   parseinfo=parseinfo)
+    unparse_args = dict(format=args.convert,
+                        projectname=projectname,
+                        disable_comments=args.comments == 'no',
+                        parseinfo=parseinfo,
+                        workers=args.workers)
 
     if args.outputfile is not None:
         destfilename = args.outputfile
@@ -1823,17 +4549,21 @@ def convert(args, parser):
     else:
         destfilename = filename
 
-    if destfilename == STDOUT:
-        buf = sys.stdout
-        try:
-            numbytes = buf.write(proj)
-        except TypeError:
-            # We are probably writing to a io.StringIO here.
-            numbytes = len(proj)
-            buf.write(unistr(proj))
-    else:
-        with open(destfilename, 'wb') as f:
-            numbytes = f.write(proj)
+    if destfilename != STDOUT:
+        # Files are written in chunks by the unparsers that support it.
+        return write_project_file(destfilename, root, **unparse_args)
+
+    proj = unparse(root, **unparse_args)
+    if proj is None:
+        reporterror('Writing the project failed: it has no valid objectVersion')
+        return CONVERT_OUTPUT_FAILED
+    buf = sys.stdout
+    try:
+        numbytes = buf.write(proj)
+    except TypeError:
+        # We are probably writing to a io.StringIO here.
+        numbytes = len(proj)
+        buf.write(unistr(proj))
 
     if numbytes is not None and numbytes != len(proj):
         reporterror('Incomplete output, only %d of %d bytes written' % (numbytes, len(proj)))
@@ -1863,19 +4593,43 @@ def cmdline_parser(parserclass=argparse.ArgumentParser):
     group.add_argument('--objectversion', action='store', default='same', help='output version of plist, e.g.: 30, 46, latest, same')
     group.add_argument('--comments', choices=['yes', 'no', 'same'], default='yes',
                        help='only meaningful for plist output, same means include if input file was commented.')
+    group.add_argument('--workers', type=int, default=None, metavar='NUM', help='number of processes for the plist output of huge projects')
 
     lintgroup = parser.add_argument_group('Lint file formats')
     lintgroup.add_argument('--lint', action='store_true', help='checks if the files are in properly commented plist format')
 
     gidgroup = parser.add_argument_group('Global ids')
     gidgroup.add_argument('--gid', nargs='?', const=1, type=int, default=None, metavar='NUM', help='number of global ids to generate')
-    gidgroup.add_argument('--gidsplit', nargs='+', default=None, metavar='GID_TO_INTERPRET', help='transform global ids into readable components')
+    gidgroup.add_argument('--gidsplit', nargs='+', default=None, metavar='GID_TO_INTERPRET',
+                          help='transform global ids into readable components, - reads them line by line from stdin')
     gidgroup.add_argument('--giddump', action='store_true', help='representation of commented gids, for software archeologists')
     gidgroup.add_argument('--gid-pid', type=int, default=None, help='pid for the global id generator')
     gidgroup.add_argument('--gid-user', default=None, help='username for the global id generator')
     gidgroup.add_argument('--gid-date', default=None, help='base date for the global id generator, e.g. 2007-01-09T16:41:00Z')
     gidgroup.add_argument('--gid-format', choices=['json', 'text'], default='text', help='output format for gidsplit and giddump')
 
+    cataloggroup = parser.add_argument_group('Catalog')
+    cataloggroup.add_argument('--catalog', metavar='DB', default=None,
+                              help='load the objects and gids of the projects in the filenames or directories'
+                                   ' into an SQLite database, use --workers to parse in parallel')
+
+    orphangroup = parser.add_argument_group('Unreachable objects')
+    orphangroup.add_argument('--orphans', action='store_true',
+                             help='report the objects that are unreachable from the rootObject, -v shows the sweep time')
+    orphangroup.add_argument('--remove', action='store_true',
+                             help='remove the reported objects from the files or write the result into the outputfile')
+
+    mergegroup = parser.add_argument_group('Merge')
+    mergegroup.add_argument('--merge', action='store_true',
+                            help='merge the three filenames base, ours and theirs into ours or the outputfile,'
+                                 ' usable as a git merge driver: xcodeprojer --merge %%O %%A %%B')
+
+    diffgroup = parser.add_argument_group('Diff')
+    diffgroup.add_argument('--diff', action='store_true',
+                           help='compare the objects of two filenames, the exit code is 1 if they differ')
+    diffgroup.add_argument('--diff-format', choices=['text', 'json', 'summary'], default='text',
+                           help='output format for diff')
+
     parser.add_argument('filename', nargs='*', help='input filename')
 
     return parser
@@ -1903,7 +4657,7 @@ def run_with_args(args, parser):
     dprint(DEBUG_OPTIONS, args)
 
     num_actions = 0
-    actions = 'convert lint gid gidsplit giddump'.split()
+    actions = 'convert lint gid gidsplit giddump catalog orphans merge diff'.split()
     for act in actions:
         if getattr(args, act):
             num_actions += 1
@@ -1915,9 +4669,20 @@ def run_with_args(args, parser):
     if args.gid is not None:
         ret = print_gids(args.gid, username=args.gid_user, pid=args.gid_pid, refdate=args.gid_date)
     elif args.gidsplit:
-        ret = gidsplit(args.gidsplit, format=args.gid_format)
+        gids = args.gidsplit
+        if gids == ['-']:
+            gids = (line.strip() for line in sys.stdin)
+        ret = gidsplit(gids, format=args.gid_format)
     elif args.giddump:
         ret = giddump(args, parser)
+    elif args.catalog:
+        ret = catalog(args, parser)
+    elif args.orphans:
+        ret = orphans(args, parser)
+    elif args.merge:
+        ret = merge_files(args, parser)
+    elif args.diff:
+        ret = structural_diff(args, parser)
     elif args.lint:
         ret = lint(args, parser)
     elif args.convert:
@@ -1931,7 +4696,7 @@ def run_with_args(args, parser):
 def main():
     parser = cmdline_parser()
     args = parser.parse_args()
-    run_with_args(args, parser)
+    return run_with_args(args, parser)
 
 if __name__ == '__main__':
     if PY3: